@@ -0,0 +1,641 @@
+"""Latency and throughput benchmark for every blueprint in src/endpoints.
+
+Seeds a database with bench/seed.py (cached in bench/data per scale), copies
+it for the run, and drives each endpoint through the Flask test client with
+bench/fake_anthropic.py standing in for the Anthropic client (or the real
+client pointed at --llm-base-url, e.g. bench/stub_server.py). Reports
+p50/p95/p99 latency and requests/s per endpoint and saves them as JSON.
+
+    python bench/api_benchmark.py [--iterations 50] [--reviews 3000000]
+    python bench/api_benchmark.py --compare bench/results/baseline.json
+
+With --compare, exits non-zero if any endpoint's p95 regressed by more
+than --tolerance against the saved results.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import os
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_anthropic import FakeAnthropic
+from bench.seed import (
+    SCHEMA_PATH,
+    add_scale_arguments,
+    scale_from_args,
+    seed_database,
+)
+from config import Config
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Below this, p95 differences are treated as noise when comparing runs
+NOISE_FLOOR_MS = 1.0
+
+LARGE_DECK_ID = 1
+SMALL_DECK_ID = 2
+USER_ID = 1
+
+
+class Scenario:
+    def __init__(
+        self,
+        name,
+        method,
+        path,
+        body=None,
+        iterations=None,
+        records=None,
+        requires=None,
+        **kwargs,
+    ):
+        # path and body may be callables taking the iteration number.
+        # records=(state key, response field) collects ids of created rows
+        # for later scenarios, which name that state key in requires.
+        self.name = name
+        self.method = method
+        self.path = path
+        self.body = body
+        self.iterations = iterations
+        self.records = records
+        self.requires = requires
+        self.kwargs = kwargs
+
+    def request(self, client, iteration):
+        path = self.path(iteration) if callable(self.path) else self.path
+        body = self.body(iteration) if callable(self.body) else self.body
+        kwargs = dict(self.kwargs)
+        if body is not None:
+            kwargs["json"] = body
+        if "data" in kwargs and callable(kwargs["data"]):
+            kwargs["data"] = kwargs["data"](iteration)
+        return client.open(path, method=self.method, **kwargs)
+
+
+def csv_upload(iteration, rows=1000):
+    lines = ["term,definition"] + [
+        f"가져온단어{iteration}-{row},imported word {row}" for row in range(rows)
+    ]
+    return {"file": (io.BytesIO("\n".join(lines).encode("utf-8")), "terms.csv")}
+
+
+def build_scenarios(state):
+    first_term = state["large_deck_first_term"]
+    small_term = state["small_deck_first_term"]
+    sentence_ids = state["small_deck_sentences"]
+
+    return [
+        Scenario("metrics.get_metrics", "GET", "/metrics"),
+        # users
+        Scenario("users.get_users", "GET", "/users"),
+        Scenario("users.get_user", "GET", f"/users/{USER_ID}"),
+        Scenario(
+            "users.create_user",
+            "POST",
+            "/users",
+            lambda i: {"username": f"bench{i}", "email": f"bench{i}@example.com"},
+        ),
+        # decks
+        Scenario("decks.get_decks[limit=50]", "GET", "/decks?limit=50"),
+        Scenario("decks.get_decks_by_user", "GET", f"/users/{USER_ID}/decks"),
+        Scenario(
+            "decks.get_decks_by_user_oldest_first",
+            "GET",
+            f"/users/{USER_ID}/decks/oldest",
+        ),
+        Scenario("decks.get_deck[large]", "GET", f"/decks/{LARGE_DECK_ID}"),
+        Scenario(
+            "decks.get_deck[large,not modified]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}",
+            headers={"If-None-Match": "*"},
+        ),
+        Scenario(
+            "decks.create_deck",
+            "POST",
+            "/decks",
+            lambda i: {
+                "user_id": USER_ID,
+                "deck_name": f"bench deck {i}",
+                "user_language": "English",
+                "deck_language": "Korean",
+            },
+            records=("created_decks", "deck_id"),
+        ),
+        Scenario(
+            "decks.delete_deck",
+            "DELETE",
+            lambda i: f"/decks/{state['created_decks'][i]}",
+            requires="created_decks",
+        ),
+        Scenario(
+            "decks.create_deck[for hard delete]",
+            "POST",
+            "/decks",
+            lambda i: {
+                "user_id": USER_ID,
+                "deck_name": f"bench deck {i}",
+                "user_language": "English",
+                "deck_language": "Korean",
+            },
+            records=("hard_deleted_decks", "deck_id"),
+        ),
+        Scenario(
+            "decks.delete_deck[hard]",
+            "DELETE",
+            lambda i: f"/decks/{state['hard_deleted_decks'][i]}?mode=hard",
+            requires="hard_deleted_decks",
+        ),
+        # terms
+        Scenario(
+            "terms.get_terms_by_user[limit=100]",
+            "GET",
+            f"/users/{USER_ID}/terms?limit=100",
+        ),
+        Scenario(
+            "terms.get_terms_by_deck[large,limit=500]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/terms?limit=500",
+        ),
+        Scenario(
+            "terms.get_terms_by_deck[large,limit=1000]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/terms?limit=1000",
+            iterations=5,
+        ),
+        Scenario(
+            "terms.get_terms_by_deck[large,limit=1000,columnar]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/terms?limit=1000&format=columnar",
+            iterations=5,
+        ),
+        Scenario(
+            "terms.get_terms_by_deck[large,not modified]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/terms",
+            # "*" matches any current ETag, so this measures the 304 path
+            headers={"If-None-Match": "*"},
+        ),
+        Scenario("terms.get_term", "GET", f"/terms/{first_term}"),
+        Scenario(
+            "terms.create_term",
+            "POST",
+            f"/decks/{state['scratch_deck']}/terms",
+            lambda i: {"term": f"새단어{i}", "definition": f"new word {i}"},
+            records=("created_terms", "term_id"),
+        ),
+        Scenario(
+            "terms.update_term",
+            "PUT",
+            lambda i: f"/terms/{state['created_terms'][i]}",
+            lambda i: {"definition": f"updated word {i}"},
+            requires="created_terms",
+        ),
+        Scenario(
+            "terms.delete_term",
+            "DELETE",
+            lambda i: f"/terms/{state['created_terms'][i]}",
+            requires="created_terms",
+        ),
+        Scenario(
+            "terms.bulk_update_terms[100 creates]",
+            "POST",
+            f"/decks/{state['scratch_deck']}/terms/bulk",
+            lambda i: {
+                "create": [
+                    {"term": f"일괄{i}-{n}", "definition": f"bulk word {n}"}
+                    for n in range(100)
+                ]
+            },
+        ),
+        Scenario(
+            "terms.import_terms_from_csv[1000 rows]",
+            "POST",
+            f"/decks/{state['scratch_deck']}/import_terms",
+            iterations=5,
+            data=csv_upload,
+            content_type="multipart/form-data",
+        ),
+        # prompts
+        Scenario(
+            "prompts.generate_sentences[count=10]",
+            "POST",
+            f"/decks/{SMALL_DECK_ID}/generate_sentences?count=10",
+        ),
+        Scenario(
+            "prompts.stream_generated_sentences[count=10]",
+            "GET",
+            f"/decks/{SMALL_DECK_ID}/generate_sentences/stream?count=10",
+        ),
+        Scenario(
+            "prompts.translate_sentence",
+            "POST",
+            lambda i: f"/sentences/{sentence_ids[i % len(sentence_ids)]}/translate",
+            lambda i: {"translation": f"My translation {i}."},
+        ),
+        Scenario(
+            "prompts.translate_sentence[cached]",
+            "POST",
+            f"/sentences/{sentence_ids[0]}/translate",
+            {"translation": "My translation 0."},
+        ),
+        Scenario(
+            "prompts.batch_translate_sentences[10]",
+            "POST",
+            "/sentences/batch-translate",
+            lambda i: {
+                "translations": [
+                    {"sentence_id": sentence_id, "translation": f"Batch {i}."}
+                    for sentence_id in sentence_ids[:10]
+                ]
+            },
+        ),
+        Scenario(
+            "prompts.batch_translate_sentences[soft-deleted deck]",
+            "POST",
+            "/sentences/batch-translate",
+            lambda i: {
+                "translations": [
+                    {"sentence_id": sentence_ids[0], "translation": f"Batch {i}."},
+                    {
+                        "sentence_id": state["deleted_deck_sentence"],
+                        "translation": f"Batch {i}.",
+                    },
+                ]
+            },
+        ),
+        # sentences
+        Scenario(
+            "sentences.get_sentences[limit=100]",
+            "GET",
+            f"/decks/{SMALL_DECK_ID}/sentences?limit=100",
+        ),
+        Scenario(
+            "sentences.get_sentences_by_term",
+            "GET",
+            f"/terms/{small_term}/sentences",
+        ),
+        Scenario(
+            "sentences.get_term_usage[large]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/term-usage",
+            iterations=5,
+        ),
+        Scenario(
+            "sentences.archive_sentences",
+            "POST",
+            f"/decks/{SMALL_DECK_ID}/archive-sentences?evaluated_only=true",
+            iterations=5,
+        ),
+        # anki
+        Scenario(
+            "anki.initialize_anki_deck[large]",
+            "POST",
+            f"/decks/{LARGE_DECK_ID}/anki/initialize",
+        ),
+        Scenario(
+            "anki.load_more_cards[large]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/anki/load-more-cards",
+        ),
+        Scenario(
+            "anki.rate_anki_card",
+            "POST",
+            "/anki/rate",
+            lambda i: {
+                "term_id": first_term + i,
+                "rating": i % 4 + 1,
+                "interval": 1,
+                "easeFactor": 2.5,
+            },
+        ),
+        Scenario(
+            "anki.get_next_intervals",
+            "POST",
+            "/anki/next-intervals",
+            {"interval": 3, "easeFactor": 2.5},
+        ),
+        Scenario(
+            "anki.get_deck_forecast[large]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/anki/forecast?seed=1",
+            iterations=5,
+        ),
+        Scenario(
+            "anki.get_user_forecast",
+            "GET",
+            f"/users/{USER_ID}/anki/forecast?seed=1",
+            iterations=5,
+        ),
+        Scenario(
+            "anki.get_deck_stats[large]",
+            "GET",
+            f"/decks/{LARGE_DECK_ID}/anki/stats?days=90",
+        ),
+        Scenario(
+            "anki.get_user_stats",
+            "GET",
+            f"/users/{USER_ID}/anki/stats?days=365",
+        ),
+        Scenario(
+            "anki.reset_anki_progress[small]",
+            "POST",
+            f"/decks/{SMALL_DECK_ID}/anki/reset",
+            iterations=5,
+        ),
+        # jobs
+        Scenario("jobs.get_job", "GET", f"/jobs/{state['job_id']}"),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(client, scenario, state, iterations, warmup):
+    count = scenario.iterations or iterations
+    errors = 0
+    durations = []
+    for iteration in range(warmup + count):
+        start = time.perf_counter()
+        response = scenario.request(client, iteration)
+        response.get_data()
+        elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            errors += 1
+        elif scenario.records:
+            key, field = scenario.records
+            state[key].append(response.get_json()[field])
+        if iteration >= warmup:
+            durations.append(elapsed)
+
+    durations.sort()
+    total = sum(durations)
+    return {
+        "requests": len(durations),
+        "errors": errors,
+        "mean_ms": total / len(durations) * 1000,
+        "p50_ms": percentile(durations, 0.50) * 1000,
+        "p95_ms": percentile(durations, 0.95) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "throughput_rps": len(durations) / total if total else 0.0,
+    }
+
+
+def prepare_state(app, client):
+    from src import db
+    from src.models import Deck, GeneratedSentence, Term
+
+    with app.app_context():
+        first_term = (
+            db.session.query(db.func.min(Term.term_id))
+            .filter_by(deck_id=LARGE_DECK_ID)
+            .scalar()
+        )
+        small_term = (
+            db.session.query(db.func.min(Term.term_id))
+            .filter_by(deck_id=SMALL_DECK_ID)
+            .scalar()
+        )
+        sentences = [
+            sentence_id
+            for (sentence_id,) in db.session.query(GeneratedSentence.id)
+            .filter_by(deck_id=SMALL_DECK_ID)
+            .order_by(GeneratedSentence.id)
+        ]
+
+        # Soft-deleted but not purged yet, as after a restart mid-purge
+        deleted_deck = Deck(
+            user_id=USER_ID,
+            deck_name="bench deleted",
+            user_language="English",
+            deck_language="Korean",
+            deleted_at=datetime.now(),
+        )
+        deleted_deck_sentence = GeneratedSentence(
+            deck=deleted_deck,
+            user_lang_given=False,
+            sentence="지운 덱의 문장이에요.",
+            machine_translation="A sentence of a deleted deck.",
+        )
+        db.session.add_all([deleted_deck, deleted_deck_sentence])
+        db.session.commit()
+        deleted_deck_sentence = deleted_deck_sentence.id
+
+    scratch_deck = client.post(
+        "/decks",
+        json={
+            "user_id": USER_ID,
+            "deck_name": "bench scratch",
+            "user_language": "English",
+            "deck_language": "Korean",
+        },
+    ).get_json()["deck_id"]
+    job = client.post(
+        f"/decks/{SMALL_DECK_ID}/generate_sentences?count=2&async=true"
+    ).get_json()
+    for _ in range(100):
+        if client.get(f"/jobs/{job['job_id']}").get_json()["status"] in (
+            "succeeded",
+            "failed",
+        ):
+            break
+        time.sleep(0.05)
+
+    return {
+        "large_deck_first_term": first_term,
+        "small_deck_first_term": small_term,
+        "small_deck_sentences": sentences,
+        "deleted_deck_sentence": deleted_deck_sentence,
+        "scratch_deck": scratch_deck,
+        "job_id": job["job_id"],
+        "created_decks": [],
+        "hard_deleted_decks": [],
+        "created_terms": [],
+    }
+
+
+def seeded_database(scale, seed, reseed):
+    # Seeding millions of rows takes a while, so templates are kept per scale
+    # (and per schema, so they are rebuilt after a migration)
+    with open(SCHEMA_PATH, "rb") as f:
+        schema = hashlib.sha256(f.read()).hexdigest()
+    key = hashlib.sha256(
+        json.dumps(
+            {"scale": scale, "seed": seed, "schema": schema}, sort_keys=True
+        ).encode()
+    ).hexdigest()[:12]
+    template = os.path.join(DATA_DIR, f"seed-{key}.db")
+    if reseed or not os.path.exists(template):
+        print(f"Seeding {template} ...")
+        start = time.perf_counter()
+        counts = seed_database(template, scale, seed)
+        print(
+            ", ".join(f"{count:,} {name}" for name, count in counts.items())
+            + f" ({time.perf_counter() - start:.1f}s)"
+        )
+
+    run_path = os.path.join(DATA_DIR, "run.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(run_path + suffix):
+            os.remove(run_path + suffix)
+    shutil.copyfile(template, run_path)
+    return run_path
+
+
+def create_bench_app(db_path, args):
+    from src import create_app
+    from src.llm import LLMGateway
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + db_path
+        STORAGE_PROFILE = args.storage_profile
+        SENTENCE_POOL_SIZE = args.pool_size
+        LLM_BASE_URL = args.llm_base_url
+
+    app = create_app(BenchConfig)
+    if not args.llm_base_url:
+        app.extensions["llm_gateway"] = LLMGateway.from_config(
+            app.config, client=FakeAnthropic(latency=args.llm_latency_ms / 1000)
+        )
+    return app
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(
+        f"\n{'endpoint':48} {'n':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} "
+        f"{'p99 ms':>9} {'req/s':>9}"
+    )
+    for name, stats in results.items():
+        print(
+            f"{name:48} {stats['requests']:>5} {stats['errors']:>4} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+            f"{stats['p99_ms']:>9.2f} {stats['throughput_rps']:>9.1f}"
+        )
+
+
+def compare_results(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%} on p95):")
+    print(f"{'endpoint':48} {'p95 before':>11} {'p95 after':>10} {'change':>8}")
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]["p95_ms"], stats["p95_ms"]
+        change = (after - before) / before if before else 0.0
+        regressed = after > before * (1 + tolerance) and after - before > NOISE_FLOOR_MS
+        regressions += regressed
+        print(
+            f"{name:48} {before:>11.2f} {after:>10.2f} {change:>+8.0%}"
+            f"{'  REGRESSED' if regressed else ''}"
+        )
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--iterations", type=int, default=50)
+    arg_parser.add_argument("--warmup", type=int, default=2)
+    arg_parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    arg_parser.add_argument("--pool-size", type=int, default=0)
+    arg_parser.add_argument(
+        "--llm-base-url",
+        help="use the real client against this server (e.g. bench/stub_server.py)",
+    )
+    arg_parser.add_argument("--storage-profile", default=Config.STORAGE_PROFILE)
+    arg_parser.add_argument("--only", help="run scenarios whose name contains this")
+    arg_parser.add_argument("--output", help="where to save results (JSON)")
+    arg_parser.add_argument("--compare", help="saved results to compare against")
+    arg_parser.add_argument("--tolerance", type=float, default=0.2)
+    arg_parser.add_argument("--reseed", action="store_true")
+    add_scale_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    scale = scale_from_args(args)
+    db_path = seeded_database(scale, args.seed, args.reseed)
+    app = create_bench_app(db_path, args)
+    client = app.test_client()
+
+    state = prepare_state(app, client)
+    scenarios = [
+        scenario
+        for scenario in build_scenarios(state)
+        if not args.only or args.only in scenario.name
+    ]
+
+    results = {}
+    for scenario in scenarios:
+        needed = (scenario.iterations or args.iterations) + args.warmup
+        if scenario.requires and len(state[scenario.requires]) < needed:
+            print(f"{scenario.name:48} skipped, needs {scenario.requires}")
+            continue
+        stats = run_scenario(client, scenario, state, args.iterations, args.warmup)
+        results[scenario.name] = stats
+        print(
+            f"{scenario.name:48} p50 {stats['p50_ms']:8.2f} ms"
+            f"  p95 {stats['p95_ms']:8.2f} ms  {stats['throughput_rps']:8.1f} req/s"
+        )
+
+    print_results(results)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"api-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "created_at": datetime.now().isoformat(),
+                "git_commit": git_commit(),
+                "scale": scale,
+                "seed": args.seed,
+                "settings": {
+                    "iterations": args.iterations,
+                    "warmup": args.warmup,
+                    "llm_latency_ms": args.llm_latency_ms,
+                    "pool_size": args.pool_size,
+                    "llm_base_url": args.llm_base_url,
+                    "storage_profile": args.storage_profile,
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\nSaved results to {output}")
+
+    if args.compare and compare_results(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Deterministic stand-in for the Anthropic client behind src/llm.py.
+
+Answers generation prompts with one well-formed block per Key Term and
+evaluation prompts with a rating derived from the prompt, after an optional
+fixed delay. Usage numbers are estimated from the prompt length, with
+cacheable prefixes counted as cache reads after the first time they are seen.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+KEY_TERM_PATTERN = re.compile(r"^\s*Term: (.+?) : (.*)$", re.MULTILINE)
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def prompt_blocks(messages):
+    content = messages[-1]["content"]
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return content
+
+
+class FakeMessages:
+    def __init__(self, latency=0.0, stream_chunk_size=16):
+        self.latency = latency
+        self.stream_chunk_size = stream_chunk_size
+        self.calls = 0
+        self._cached_prefixes = set()
+        self._lock = threading.Lock()
+
+    def create(self, model, max_tokens, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text, usage = self._respond(messages)
+        return SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage)
+
+    def stream(self, model, max_tokens, messages, timeout=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        text, usage = self._respond(messages)
+        return FakeStream(text, usage, self.latency, self.stream_chunk_size)
+
+    def _respond(self, messages):
+        blocks = prompt_blocks(messages)
+        prompt = "\n".join(block["text"] for block in blocks)
+
+        if "evaluate" in prompt:
+            digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+            text = f"Review: Deterministic review {digest[:4].hex()}.\nRating: {digest[0] % 10 + 1}"
+        else:
+            # The Key Terms come last in the generation prompt
+            key_terms = KEY_TERM_PATTERN.findall(blocks[-1]["text"])
+            text = "\n\n".join(
+                f"Sentence: {term} 문장 {index}.\n"
+                f"Translation: Sentence {index} about {definition}.\n"
+                f"Terms used: {term} ::: {definition}\n"
+                f"New terms: 문장 ::: sentence"
+                for index, (term, definition) in enumerate(key_terms, 1)
+            )
+
+        usage = {
+            "input_tokens": 0,
+            "output_tokens": estimate_tokens(text),
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        for block in blocks:
+            tokens = estimate_tokens(block["text"])
+            if "cache_control" not in block:
+                usage["input_tokens"] += tokens
+                continue
+            key = hashlib.sha256(block["text"].encode("utf-8")).digest()
+            with self._lock:
+                seen = key in self._cached_prefixes
+                self._cached_prefixes.add(key)
+            usage[
+                "cache_read_input_tokens" if seen else "cache_creation_input_tokens"
+            ] += tokens
+
+        return text, SimpleNamespace(**usage)
+
+
+class FakeStream:
+    def __init__(self, text, usage, latency, chunk_size):
+        self.text = text
+        self.usage = usage
+        self.latency = latency
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        chunks = range(0, len(self.text), self.chunk_size)
+        delay = self.latency / max(1, len(chunks))
+        for start in chunks:
+            if delay:
+                time.sleep(delay)
+            yield self.text[start : start + self.chunk_size]
+
+    def get_final_message(self):
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=self.text)], usage=self.usage
+        )
+
+
+class FakeAnthropic:
+    def __init__(self, latency=0.0):
+        self.messages = FakeMessages(latency)
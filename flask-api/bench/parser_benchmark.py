@@ -0,0 +1,96 @@
+"""Yield and throughput benchmark for src/sentence_parser.py.
+
+Runs every recorded response in bench/corpus through the parser, both in one
+piece and in small streamed chunks. Checks the number of accepted and
+rejected blocks against corpus/manifest.json, then times repeated parses.
+
+    python bench/parser_benchmark.py [--iterations 2000]
+
+Exits non-zero if any response yields a different number of sentences than
+recorded, so prompt-format changes that lose sentences are caught.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.sentence_parser import SentenceParser, parse_sentences
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def parse_streamed(text, all_term_set, chunk_size):
+    parser = SentenceParser(all_term_set)
+    for start in range(0, len(text), chunk_size):
+        parser.feed(text[start : start + chunk_size])
+    parser.close()
+    return parser.sentences, parser.rejected
+
+
+def check_yield(responses, all_term_set):
+    failures = 0
+    print(f"{'response':32} {'sentences':>9} {'rejected':>8} {'expected':>8}")
+    for name, text, expected in responses:
+        sentences, rejected = parse_sentences(text, all_term_set)
+        streamed = parse_streamed(text, all_term_set, chunk_size=7)
+
+        ok = (
+            len(sentences) == expected["sentences"]
+            and len(rejected) == expected["rejected"]
+            and streamed == (sentences, rejected)
+        )
+        failures += not ok
+        print(
+            f"{name:32} {len(sentences):>9} {len(rejected):>8} "
+            f"{expected['sentences']:>5}/{expected['rejected']:<2}"
+            f"{'' if ok else '  FAIL'}"
+        )
+    return failures
+
+
+def measure_throughput(responses, all_term_set, iterations):
+    texts = [text for _, text, _ in responses]
+    total_bytes = sum(len(text.encode("utf-8")) for text in texts) * iterations
+
+    blocks = 0
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            sentences, rejected = parse_sentences(text, all_term_set)
+            blocks += len(sentences) + len(rejected)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"\n{iterations} iterations: {blocks / elapsed:,.0f} blocks/s, "
+        f"{total_bytes / elapsed / 1e6:.2f} MB/s ({elapsed:.3f}s)"
+    )
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--iterations", type=int, default=2000)
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(CORPUS_DIR, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+    all_term_set = {term.lower() for term in manifest["terms"]}
+
+    responses = []
+    for name, expected in manifest["responses"].items():
+        with open(os.path.join(CORPUS_DIR, name), encoding="utf-8") as f:
+            responses.append((name, f.read(), expected))
+
+    failures = check_yield(responses, all_term_set)
+    measure_throughput(responses, all_term_set, args.iterations)
+
+    if failures:
+        print(f"\n{failures} response(s) did not match the recorded yield")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
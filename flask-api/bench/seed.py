@@ -0,0 +1,258 @@
+"""Seed a SQLite database with synthetic data at a configurable scale.
+
+Builds the schema from setup/base_schema.sql and bulk-inserts users, decks,
+terms, Anki state, review history (with its daily rollup) and generated
+sentences. The same
+arguments and --seed always produce the same database.
+
+    python bench/seed.py bench/data/large.db --large-deck-terms 50000 --reviews 3000000
+
+User 1 owns deck 1, the large deck, and has studied most of it; the Anki
+endpoints are hard-wired to user 1.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "setup", "base_schema.sql")
+INSERT_BATCH_SIZE = 50000
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+DEFAULT_SCALE = {
+    "users": 20,
+    "decks_per_user": 3,
+    "terms_per_deck": 300,
+    "large_deck_terms": 50000,
+    "reviews": 500000,
+    "sentences_per_deck": 20,
+    "studied_fraction": 0.6,
+}
+
+# Anki ratings 1-4, roughly as often as learners pick them
+RATING_WEIGHTS = (0.1, 0.15, 0.5, 0.25)
+
+
+def timestamp(value):
+    return value.strftime(DATETIME_FORMAT)
+
+
+def insert_rows(connection, statement, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            connection.executemany(statement, batch)
+            batch = []
+    if batch:
+        connection.executemany(statement, batch)
+
+
+def seed_database(path, scale=None, seed=0):
+    scale = {**DEFAULT_SCALE, **(scale or {})}
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    with open(SCHEMA_PATH, encoding="utf-8") as f:
+        connection.executescript(f.read())
+
+    created_at = timestamp(now - timedelta(days=400))
+    insert_rows(
+        connection,
+        "INSERT INTO users (user_id, username, email, created_at) VALUES (?, ?, ?, ?)",
+        (
+            (user_id, f"user{user_id}", f"user{user_id}@example.com", created_at)
+            for user_id in range(1, scale["users"] + 1)
+        ),
+    )
+
+    decks = []
+    for user_id in range(1, scale["users"] + 1):
+        for _ in range(scale["decks_per_user"]):
+            deck_id = len(decks) + 1
+            term_count = (
+                scale["large_deck_terms"] if deck_id == 1 else scale["terms_per_deck"]
+            )
+            decks.append((deck_id, user_id, term_count))
+    insert_rows(
+        connection,
+        "INSERT INTO decks (deck_id, user_id, deck_name, user_language, deck_language,"
+        " is_public, created_at) VALUES (?, ?, ?, 'English', 'Korean', ?, ?)",
+        (
+            (
+                deck_id,
+                user_id,
+                f"deck {deck_id}",
+                deck_id % 5 == 0,
+                timestamp(now - timedelta(days=300 - deck_id % 300)),
+            )
+            for deck_id, user_id, _ in decks
+        ),
+    )
+
+    # Term ids are assigned contiguously per deck
+    deck_terms = {}
+    next_term_id = 1
+    for deck_id, _, term_count in decks:
+        deck_terms[deck_id] = range(next_term_id, next_term_id + term_count)
+        next_term_id += term_count
+    insert_rows(
+        connection,
+        "INSERT INTO terms (term_id, deck_id, term, definition, created_at)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (
+            (term_id, deck_id, f"단어{term_id}", f"word {term_id}", created_at)
+            for deck_id, term_ids in deck_terms.items()
+            for term_id in term_ids
+        ),
+    )
+
+    # Each user studies part of each of their own decks
+    studied = []
+    for deck_id, user_id, _ in decks:
+        term_ids = deck_terms[deck_id]
+        count = int(len(term_ids) * scale["studied_fraction"])
+        studied.extend((user_id, term_id) for term_id in term_ids[:count])
+
+    def user_term_rows():
+        for user_id, term_id in studied:
+            interval = rng.choice((0, 1, 3, 7, 15, 30, 60, 120))
+            last_reviewed = now - timedelta(days=rng.uniform(0, 60))
+            next_review = last_reviewed + timedelta(days=interval)
+            yield (
+                user_id,
+                term_id,
+                timestamp(last_reviewed),
+                timestamp(next_review),
+                round(rng.uniform(1.3, 3.0), 2),
+                interval,
+            )
+
+    insert_rows(
+        connection,
+        "INSERT INTO user_term_data (user_id, term_id, last_reviewed, next_review,"
+        " ease_factor, interval) VALUES (?, ?, ?, ?, ?, ?)",
+        user_term_rows(),
+    )
+
+    def review_rows():
+        if not studied:
+            return
+        ratings = rng.choices((1, 2, 3, 4), RATING_WEIGHTS, k=scale["reviews"])
+        for rating in ratings:
+            user_id, term_id = studied[rng.randrange(len(studied))]
+            review_date = now - timedelta(seconds=rng.randrange(365 * 86400))
+            yield user_id, term_id, timestamp(review_date), rating
+
+    insert_rows(
+        connection,
+        "INSERT INTO review_history (user_id, term_id, review_date, rating)"
+        " VALUES (?, ?, ?, ?)",
+        review_rows(),
+    )
+
+    # What `flask backfill-review-stats` would build from the history
+    connection.execute(
+        "INSERT INTO review_daily_stats (user_id, deck_id, review_day, rating,"
+        " review_count) SELECT review_history.user_id, terms.deck_id,"
+        " date(review_date), rating, count(*) FROM review_history"
+        " JOIN terms ON terms.term_id = review_history.term_id"
+        " GROUP BY review_history.user_id, terms.deck_id, date(review_date), rating"
+    )
+
+    sentence_rows = []
+    link_rows = []
+    for deck_id, _, _ in decks:
+        term_ids = deck_terms[deck_id]
+        for index in range(scale["sentences_per_deck"]):
+            sentence_id = len(sentence_rows) + 1
+            used = rng.sample(term_ids, min(2, len(term_ids)))
+            terms_used = {f"단어{term_id}": f"word {term_id}" for term_id in used}
+            evaluated = index % 2 == 0
+            sentence_rows.append(
+                (
+                    sentence_id,
+                    deck_id,
+                    False,
+                    " ".join(terms_used) + " 문장이에요.",
+                    "A sentence with " + ", ".join(terms_used.values()) + ".",
+                    json.dumps(terms_used),
+                    "{}",
+                    "My translation." if evaluated else None,
+                    rng.randint(1, 10) if evaluated else None,
+                    "Looks good." if evaluated else None,
+                    timestamp(now - timedelta(days=index)),
+                )
+            )
+            link_rows.extend(
+                (deck_id, sentence_id, term_id, f"단어{term_id}", f"word {term_id}")
+                for term_id in used
+            )
+    insert_rows(
+        connection,
+        "INSERT INTO generated_sentences (id, deck_id, user_lang_given, sentence,"
+        " machine_translation, terms_used_json, new_terms_json, user_translation,"
+        " evaluation_rating, evaluation_text, created_at)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        sentence_rows,
+    )
+    insert_rows(
+        connection,
+        "INSERT INTO sentence_terms (deck_id, generated_sentence_id, term_id, term,"
+        " definition, is_new) VALUES (?, ?, ?, ?, ?, 0)",
+        link_rows,
+    )
+
+    connection.commit()
+    connection.execute("ANALYZE")
+    connection.close()
+
+    return {
+        "users": scale["users"],
+        "decks": len(decks),
+        "terms": next_term_id - 1,
+        "user_term_data": len(studied),
+        "review_history": scale["reviews"] if studied else 0,
+        "generated_sentences": len(sentence_rows),
+    }
+
+
+def add_scale_arguments(arg_parser):
+    for name, default in DEFAULT_SCALE.items():
+        arg_parser.add_argument(
+            "--" + name.replace("_", "-"), type=type(default), default=default
+        )
+    arg_parser.add_argument("--seed", type=int, default=0)
+
+
+def scale_from_args(args):
+    return {name: getattr(args, name) for name in DEFAULT_SCALE}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("path")
+    add_scale_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed_database(args.path, scale_from_args(args), args.seed)
+    print(
+        ", ".join(f"{count:,} {name}" for name, count in counts.items())
+        + f" ({time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Local stand-in for the Anthropic Messages API, for exercising src/llm.py.
+
+Serves POST /v1/messages (plain and streamed) with the same deterministic
+answers as bench/fake_anthropic.py, and can inject latency, 429 and 529
+responses so retries, deadlines and the circuit breaker can be observed
+through the real client:
+
+    python bench/stub_server.py --port 8765 --latency 0.5 --rate-limit-every 3
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=stub flask run
+    python bench/api_benchmark.py --llm-base-url http://127.0.0.1:8765
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from bench.fake_anthropic import FakeMessages
+
+STREAM_CHUNK_SIZE = 16
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Set by make_server
+    options = None
+    responder = None
+    counter = None
+    counter_lock = None
+
+    def log_message(self, format, *args):
+        if not self.options.quiet:
+            super().log_message(format, *args)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.split("?")[0] != "/v1/messages":
+            return self.send_json(404, error("not_found_error", "Not found"))
+
+        with self.counter_lock:
+            number = next(self.counter)
+
+        if self.options.latency:
+            time.sleep(self.options.latency)
+
+        every = self.options.rate_limit_every
+        if every and number % every == 0:
+            return self.send_json(
+                429,
+                error("rate_limit_error", "Rate limited by stub"),
+                {"retry-after": "0"},
+            )
+        if random.random() < self.options.overload_rate:
+            return self.send_json(529, error("overloaded_error", "Overloaded"))
+
+        text, usage = self.responder._respond(body["messages"])
+        usage = vars(usage)
+        message = {
+            "id": f"msg_stub_{number}",
+            "type": "message",
+            "role": "assistant",
+            "model": body["model"],
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+
+        if body.get("stream"):
+            self.send_stream(message, text, usage)
+        else:
+            self.send_json(200, message)
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, message, text, usage):
+        events = [
+            (
+                "message_start",
+                {
+                    "type": "message_start",
+                    "message": {
+                        **message,
+                        "content": [],
+                        "stop_reason": None,
+                        "usage": {**usage, "output_tokens": 0},
+                    },
+                },
+            ),
+            (
+                "content_block_start",
+                {
+                    "type": "content_block_start",
+                    "index": 0,
+                    "content_block": {"type": "text", "text": ""},
+                },
+            ),
+            *(
+                (
+                    "content_block_delta",
+                    {
+                        "type": "content_block_delta",
+                        "index": 0,
+                        "delta": {
+                            "type": "text_delta",
+                            "text": text[start : start + STREAM_CHUNK_SIZE],
+                        },
+                    },
+                )
+                for start in range(0, len(text), STREAM_CHUNK_SIZE)
+            ),
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            (
+                "message_delta",
+                {
+                    "type": "message_delta",
+                    "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                    "usage": {"output_tokens": usage["output_tokens"]},
+                },
+            ),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for event, data in events:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def error(error_type, message):
+    return {"type": "error", "error": {"type": error_type, "message": message}}
+
+
+def make_server(host, port, options):
+    handler = type(
+        "Handler",
+        (StubHandler,),
+        {
+            "options": options,
+            "responder": FakeMessages(),
+            "counter": itertools.count(1),
+            "counter_lock": threading.Lock(),
+        },
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    arg_parser.add_argument(
+        "--rate-limit-every", type=int, default=0, help="answer every Nth call with 429"
+    )
+    arg_parser.add_argument(
+        "--overload-rate", type=float, default=0.0, help="fraction of calls given 529"
+    )
+    arg_parser.add_argument("--quiet", action="store_true")
+    options = arg_parser.parse_args()
+
+    server = make_server(options.host, options.port, options)
+    print(f"Stub Anthropic API on http://{options.host}:{options.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,95 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 class Config:
     SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(basedir, "test_database.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+
+    # SQLite storage profiles: PRAGMAs applied to every new connection
+    STORAGE_PROFILES = {
+        "legacy": {},
+        "balanced": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -20000,
+            "mmap_size": 256 * 1024 * 1024,
+        },
+        "durable": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "busy_timeout": 10000,
+            "cache_size": -20000,
+        },
+        "throughput": {
+            "journal_mode": "WAL",
+            "synchronous": "OFF",
+            "busy_timeout": 5000,
+            "cache_size": -64000,
+            "mmap_size": 1024 * 1024 * 1024,
+            "temp_store": "MEMORY",
+        },
+    }
+    STORAGE_PROFILE = os.environ.get("STORAGE_PROFILE", "balanced")
+    # Size of the separate query_only pool that @read_only endpoints use (0 disables)
+    READ_POOL_SIZE = int(os.environ.get("READ_POOL_SIZE", 10))
+
+    # Translation evaluation cache: in-memory LRU in front of a SQLite table
+    EVALUATION_CACHE_SIZE = int(os.environ.get("EVALUATION_CACHE_SIZE", 1024))
+    EVALUATION_CACHE_TTL = int(os.environ.get("EVALUATION_CACHE_TTL", 30 * 86400))
+    EVALUATION_CACHE_MAX_ROWS = int(os.environ.get("EVALUATION_CACHE_MAX_ROWS", 100000))
+
+    # Read-through cache of deck metadata and term lists: "memory" keeps up to
+    # DECK_CACHE_SIZE entries per process (0 disables, DECK_CACHE_TTL in
+    # seconds bounds their age); "sqlite" shares them between worker
+    # processes through the DECK_CACHE_PATH file
+    DECK_CACHE_BACKEND = os.environ.get("DECK_CACHE_BACKEND", "memory")
+    DECK_CACHE_SIZE = int(os.environ.get("DECK_CACHE_SIZE", 256))
+    DECK_CACHE_TTL = float(os.environ.get("DECK_CACHE_TTL", 0)) or None
+    DECK_CACHE_PATH = os.environ.get(
+        "DECK_CACHE_PATH", os.path.join(basedir, "deck_cache.db")
+    )
+
+    # Max creates + updates + deletes in one /decks/<id>/terms/bulk request
+    MAX_BULK_TERMS = int(os.environ.get("MAX_BULK_TERMS", 5000))
+
+    # DELETE /decks/<id> default: "soft" hides the deck and purges its rows in
+    # a background job, DECK_PURGE_BATCH_SIZE rows per transaction with a
+    # DECK_PURGE_PAUSE (seconds) between them; "hard" deletes in one transaction
+    DECK_DELETE_MODE = os.environ.get("DECK_DELETE_MODE", "soft")
+    DECK_PURGE_BATCH_SIZE = int(os.environ.get("DECK_PURGE_BATCH_SIZE", 500))
+    DECK_PURGE_PAUSE = float(os.environ.get("DECK_PURGE_PAUSE", 0.01))
+
+    # Batch translation grading: max items per request and concurrent LLM calls
+    MAX_EVALUATION_BATCH_SIZE = int(os.environ.get("MAX_EVALUATION_BATCH_SIZE", 50))
+    EVALUATION_BATCH_CONCURRENCY = int(
+        os.environ.get("EVALUATION_BATCH_CONCURRENCY", 5)
+    )
+
+    # Pre-generated sentences kept per deck and direction (0 disables the pool)
+    SENTENCE_POOL_SIZE = int(os.environ.get("SENTENCE_POOL_SIZE", 10))
+    SENTENCE_POOL_BATCH_SIZE = int(os.environ.get("SENTENCE_POOL_BATCH_SIZE", 10))
+
+    # Approximate tokens of deck terms listed as context in a generation prompt
+    # (0 lists the whole deck); key terms are chosen separately
+    GENERATION_TERM_TOKEN_BUDGET = int(
+        os.environ.get("GENERATION_TERM_TOKEN_BUDGET", 2000)
+    )
+
+    # Simulated runs averaged into a review forecast
+    FORECAST_RUNS = int(os.environ.get("FORECAST_RUNS", 4))
+
+    # Request/SQL/LLM metrics served on /metrics, and a log of requests slower
+    # than SLOW_REQUEST_SECONDS with the SQL they ran (0 disables the log)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", 0))
+
+    # LLM gateway: calls in flight per process, per-attempt timeout and overall
+    # deadline (seconds), retries on 429/529 and the circuit breaker
+    LLM_BASE_URL = os.environ.get("ANTHROPIC_BASE_URL")
+    LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+    LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 60))
+    LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 120))
+    LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+    LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 0.5))
+    LLM_BACKOFF_MAX = float(os.environ.get("LLM_BACKOFF_MAX", 8))
+    LLM_BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", 5))
+    LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", 30))
@@ -15,7 +15,11 @@ CREATE TABLE decks (
     deck_language TEXT NOT NULL,
     is_public BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(user_id)
+    -- Bumped by every write that changes the deck's payloads; used for ETags
+    version INTEGER NOT NULL DEFAULT 1,
+    -- Set by a soft delete; the deck is hidden until its rows are purged
+    deleted_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
 -- Terms table
@@ -25,7 +29,7 @@ CREATE TABLE terms (
     term TEXT NOT NULL,
     definition TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (deck_id) REFERENCES decks(deck_id)
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
 );
 
 -- GeneratedSentences table
@@ -40,8 +44,9 @@ CREATE TABLE generated_sentences (
     user_translation TEXT,
     evaluation_rating INTEGER,
     evaluation_text TEXT,
+    pooled BOOLEAN NOT NULL DEFAULT 0,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (deck_id) REFERENCES decks(deck_id)
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
 );
 
 -- ArchivedSentences table
@@ -57,7 +62,24 @@ CREATE TABLE archived_sentences (
     evaluation_rating INTEGER,
     evaluation_text TEXT,
     archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (deck_id) REFERENCES decks(deck_id)
+    generated_sentence_id INTEGER,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+
+-- Terms each generated or archived sentence uses, one row per term
+CREATE TABLE sentence_terms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    generated_sentence_id INTEGER,
+    archived_sentence_id INTEGER,
+    term_id INTEGER,
+    term TEXT NOT NULL,
+    definition TEXT,
+    is_new BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE,
+    FOREIGN KEY (generated_sentence_id) REFERENCES generated_sentences(id) ON DELETE CASCADE,
+    FOREIGN KEY (archived_sentence_id) REFERENCES archived_sentences(id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE SET NULL
 );
 
 -- Create a new table for user-specific term data
@@ -69,8 +91,8 @@ CREATE TABLE user_term_data (
     next_review TIMESTAMP,
     ease_factor REAL DEFAULT 2.5,
     interval INTEGER DEFAULT 0,
-    FOREIGN KEY (user_id) REFERENCES users(user_id),
-    FOREIGN KEY (term_id) REFERENCES terms(term_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE CASCADE,
     UNIQUE(user_id, term_id)
 );
 
@@ -81,14 +103,61 @@ CREATE TABLE review_history (
     term_id INTEGER NOT NULL,
     review_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     rating INTEGER NOT NULL,
-    FOREIGN KEY (user_id) REFERENCES users(user_id),
-    FOREIGN KEY (term_id) REFERENCES terms(term_id)
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE CASCADE
+);
+
+-- Daily rollup of review_history for the analytics endpoints
+CREATE TABLE review_daily_stats (
+    user_id INTEGER NOT NULL,
+    deck_id INTEGER NOT NULL,
+    review_day DATE NOT NULL,
+    rating INTEGER NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, deck_id, review_day, rating),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+
+-- Background jobs (sentence generation etc.)
+CREATE TABLE jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    deck_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result_json TEXT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE SET NULL
+);
+
+-- Cached translation evaluations, keyed on a hash of the graded inputs
+CREATE TABLE evaluation_cache (
+    cache_key TEXT PRIMARY KEY,
+    evaluation_rating INTEGER NOT NULL,
+    evaluation_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- Create indexes for faster lookups
 CREATE INDEX idx_user_term_data ON user_term_data(user_id, term_id);
+CREATE INDEX idx_user_term_next_review ON user_term_data(user_id, next_review);
 CREATE INDEX idx_review_history ON review_history(user_id, term_id);
 CREATE INDEX idx_archived_sentence_deck ON archived_sentences(deck_id);
 CREATE INDEX idx_generated_sentence_deck ON generated_sentences(deck_id);
+CREATE INDEX idx_generated_sentences_pool ON generated_sentences(deck_id, pooled, user_lang_given);
 CREATE INDEX idx_deck_user ON decks(user_id);
-CREATE INDEX idx_term_deck ON terms(deck_id);
\ No newline at end of file
+CREATE INDEX idx_term_deck ON terms(deck_id);
+CREATE INDEX ix_evaluation_cache_created_at ON evaluation_cache(created_at);
+CREATE INDEX ix_archived_sentences_generated_sentence_id ON archived_sentences(generated_sentence_id);
+CREATE INDEX ix_sentence_terms_generated_sentence_id ON sentence_terms(generated_sentence_id);
+CREATE INDEX ix_sentence_terms_archived_sentence_id ON sentence_terms(archived_sentence_id);
+CREATE INDEX ix_sentence_terms_term_id ON sentence_terms(term_id);
+CREATE INDEX idx_sentence_terms_deck_term ON sentence_terms(deck_id, term);
+CREATE INDEX idx_review_daily_stats_user_day ON review_daily_stats(user_id, review_day);
+CREATE INDEX ix_user_term_data_term_id ON user_term_data(term_id);
+CREATE INDEX ix_review_history_term_id ON review_history(term_id);
+CREATE INDEX ix_review_daily_stats_deck_id ON review_daily_stats(deck_id);
+CREATE INDEX ix_jobs_deck_id ON jobs(deck_id);
@@ -0,0 +1,3 @@
+-- Range scans for the Anki due-card queue
+CREATE INDEX IF NOT EXISTS idx_user_term_data ON user_term_data(user_id, term_id);
+CREATE INDEX IF NOT EXISTS idx_user_term_next_review ON user_term_data(user_id, next_review);
@@ -0,0 +1,8 @@
+-- Cached translation evaluations, keyed on a hash of the graded inputs
+CREATE TABLE IF NOT EXISTS evaluation_cache (
+    cache_key TEXT PRIMARY KEY,
+    evaluation_rating INTEGER NOT NULL,
+    evaluation_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_evaluation_cache_created_at ON evaluation_cache(created_at);
@@ -0,0 +1,46 @@
+-- Normalized sentence/term links replacing lookups through the JSON blobs
+ALTER TABLE archived_sentences ADD COLUMN generated_sentence_id INTEGER;
+
+CREATE TABLE sentence_terms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    generated_sentence_id INTEGER,
+    archived_sentence_id INTEGER,
+    term_id INTEGER,
+    term TEXT NOT NULL,
+    definition TEXT,
+    is_new BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id),
+    FOREIGN KEY (generated_sentence_id) REFERENCES generated_sentences(id),
+    FOREIGN KEY (archived_sentence_id) REFERENCES archived_sentences(id),
+    FOREIGN KEY (term_id) REFERENCES terms(term_id)
+);
+
+CREATE INDEX ix_archived_sentences_generated_sentence_id ON archived_sentences(generated_sentence_id);
+CREATE INDEX ix_sentence_terms_generated_sentence_id ON sentence_terms(generated_sentence_id);
+CREATE INDEX ix_sentence_terms_archived_sentence_id ON sentence_terms(archived_sentence_id);
+CREATE INDEX ix_sentence_terms_term_id ON sentence_terms(term_id);
+CREATE INDEX idx_sentence_terms_deck_term ON sentence_terms(deck_id, term);
+
+-- Backfill links from the existing JSON columns
+INSERT INTO sentence_terms (deck_id, generated_sentence_id, term_id, term, definition, is_new)
+SELECT s.deck_id, s.id,
+       (SELECT MIN(t.term_id) FROM terms t
+        WHERE t.deck_id = s.deck_id AND lower(t.term) = lower(j.key)),
+       j.key, j.value, 0
+FROM generated_sentences s, json_each(s.terms_used_json) j;
+
+INSERT INTO sentence_terms (deck_id, generated_sentence_id, term_id, term, definition, is_new)
+SELECT s.deck_id, s.id, NULL, j.key, j.value, 1
+FROM generated_sentences s, json_each(s.new_terms_json) j;
+
+INSERT INTO sentence_terms (deck_id, archived_sentence_id, term_id, term, definition, is_new)
+SELECT s.deck_id, s.id,
+       (SELECT MIN(t.term_id) FROM terms t
+        WHERE t.deck_id = s.deck_id AND lower(t.term) = lower(j.key)),
+       j.key, j.value, 0
+FROM archived_sentences s, json_each(s.terms_used_json) j;
+
+INSERT INTO sentence_terms (deck_id, archived_sentence_id, term_id, term, definition, is_new)
+SELECT s.deck_id, s.id, NULL, j.key, j.value, 1
+FROM archived_sentences s, json_each(s.new_terms_json) j;
@@ -0,0 +1,3 @@
+-- Pre-generated sentences waiting to be served by generate_sentences
+ALTER TABLE generated_sentences ADD COLUMN pooled BOOLEAN NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_generated_sentences_pool ON generated_sentences(deck_id, pooled, user_lang_given);
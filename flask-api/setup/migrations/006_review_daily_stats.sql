@@ -0,0 +1,13 @@
+-- Daily rollup of review_history for the analytics endpoints.
+-- Fill it from existing history with `flask backfill-review-stats`.
+CREATE TABLE IF NOT EXISTS review_daily_stats (
+    user_id INTEGER NOT NULL,
+    deck_id INTEGER NOT NULL,
+    review_day DATE NOT NULL,
+    rating INTEGER NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, deck_id, review_day, rating),
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id)
+);
+CREATE INDEX IF NOT EXISTS idx_review_daily_stats_user_day ON review_daily_stats(user_id, review_day);
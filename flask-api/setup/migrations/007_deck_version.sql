@@ -0,0 +1,2 @@
+-- Version counter behind the deck ETags, bumped by term, sentence and deck writes
+ALTER TABLE decks ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,214 @@
+-- Real ON DELETE actions on every foreign key, soft-deleted decks, and the
+-- indexes the cascades search by. SQLite can't alter a foreign key in place,
+-- so each child table is rebuilt with the 12-step procedure from
+-- https://www.sqlite.org/lang_altertable.html. Back up the database first.
+PRAGMA foreign_keys = OFF;
+
+BEGIN;
+
+-- Keep AUTOINCREMENT counters, so ids of deleted rows are never reused
+CREATE TEMP TABLE saved_sequence AS SELECT name, seq FROM sqlite_sequence;
+
+-- Rows orphaned by deletes from before foreign keys were enforced
+DELETE FROM decks WHERE user_id NOT IN (SELECT user_id FROM users);
+DELETE FROM terms WHERE deck_id NOT IN (SELECT deck_id FROM decks);
+DELETE FROM generated_sentences WHERE deck_id NOT IN (SELECT deck_id FROM decks);
+DELETE FROM archived_sentences WHERE deck_id NOT IN (SELECT deck_id FROM decks);
+DELETE FROM sentence_terms
+WHERE deck_id NOT IN (SELECT deck_id FROM decks)
+   OR (generated_sentence_id IS NOT NULL
+       AND generated_sentence_id NOT IN (SELECT id FROM generated_sentences))
+   OR (archived_sentence_id IS NOT NULL
+       AND archived_sentence_id NOT IN (SELECT id FROM archived_sentences));
+UPDATE sentence_terms SET term_id = NULL
+WHERE term_id IS NOT NULL AND term_id NOT IN (SELECT term_id FROM terms);
+DELETE FROM user_term_data
+WHERE user_id NOT IN (SELECT user_id FROM users)
+   OR term_id NOT IN (SELECT term_id FROM terms);
+DELETE FROM review_history
+WHERE user_id NOT IN (SELECT user_id FROM users)
+   OR term_id NOT IN (SELECT term_id FROM terms);
+DELETE FROM review_daily_stats
+WHERE user_id NOT IN (SELECT user_id FROM users)
+   OR deck_id NOT IN (SELECT deck_id FROM decks);
+UPDATE jobs SET deck_id = NULL
+WHERE deck_id IS NOT NULL AND deck_id NOT IN (SELECT deck_id FROM decks);
+
+CREATE TABLE decks_new (
+    deck_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    deck_name TEXT NOT NULL,
+    user_language TEXT NOT NULL,
+    deck_language TEXT NOT NULL,
+    is_public BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 1,
+    deleted_at TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+INSERT INTO decks_new (deck_id, user_id, deck_name, user_language, deck_language, is_public, created_at, version)
+SELECT deck_id, user_id, deck_name, user_language, deck_language, is_public, created_at, version FROM decks;
+DROP TABLE decks;
+ALTER TABLE decks_new RENAME TO decks;
+CREATE INDEX idx_deck_user ON decks(user_id);
+
+CREATE TABLE terms_new (
+    term_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+INSERT INTO terms_new (term_id, deck_id, term, definition, created_at)
+SELECT term_id, deck_id, term, definition, created_at FROM terms;
+DROP TABLE terms;
+ALTER TABLE terms_new RENAME TO terms;
+CREATE INDEX idx_term_deck ON terms(deck_id);
+
+CREATE TABLE generated_sentences_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    user_lang_given BOOLEAN NOT NULL,
+    sentence TEXT NOT NULL,
+    machine_translation TEXT NOT NULL,
+    terms_used_json TEXT NOT NULL,
+    new_terms_json TEXT NOT NULL,
+    user_translation TEXT,
+    evaluation_rating INTEGER,
+    evaluation_text TEXT,
+    pooled BOOLEAN NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+INSERT INTO generated_sentences_new (id, deck_id, user_lang_given, sentence, machine_translation, terms_used_json, new_terms_json, user_translation, evaluation_rating, evaluation_text, pooled, created_at)
+SELECT id, deck_id, user_lang_given, sentence, machine_translation, terms_used_json, new_terms_json, user_translation, evaluation_rating, evaluation_text, pooled, created_at FROM generated_sentences;
+DROP TABLE generated_sentences;
+ALTER TABLE generated_sentences_new RENAME TO generated_sentences;
+CREATE INDEX idx_generated_sentence_deck ON generated_sentences(deck_id);
+CREATE INDEX idx_generated_sentences_pool ON generated_sentences(deck_id, pooled, user_lang_given);
+
+CREATE TABLE archived_sentences_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    user_lang_given BOOLEAN NOT NULL,
+    sentence TEXT NOT NULL,
+    machine_translation TEXT NOT NULL,
+    terms_used_json TEXT NOT NULL,
+    new_terms_json TEXT NOT NULL,
+    user_translation TEXT,
+    evaluation_rating INTEGER,
+    evaluation_text TEXT,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    generated_sentence_id INTEGER,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+INSERT INTO archived_sentences_new (id, deck_id, user_lang_given, sentence, machine_translation, terms_used_json, new_terms_json, user_translation, evaluation_rating, evaluation_text, archived_at, generated_sentence_id)
+SELECT id, deck_id, user_lang_given, sentence, machine_translation, terms_used_json, new_terms_json, user_translation, evaluation_rating, evaluation_text, archived_at, generated_sentence_id FROM archived_sentences;
+DROP TABLE archived_sentences;
+ALTER TABLE archived_sentences_new RENAME TO archived_sentences;
+CREATE INDEX idx_archived_sentence_deck ON archived_sentences(deck_id);
+CREATE INDEX ix_archived_sentences_generated_sentence_id ON archived_sentences(generated_sentence_id);
+
+CREATE TABLE sentence_terms_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    deck_id INTEGER NOT NULL,
+    generated_sentence_id INTEGER,
+    archived_sentence_id INTEGER,
+    term_id INTEGER,
+    term TEXT NOT NULL,
+    definition TEXT,
+    is_new BOOLEAN NOT NULL DEFAULT FALSE,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE,
+    FOREIGN KEY (generated_sentence_id) REFERENCES generated_sentences(id) ON DELETE CASCADE,
+    FOREIGN KEY (archived_sentence_id) REFERENCES archived_sentences(id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE SET NULL
+);
+INSERT INTO sentence_terms_new (id, deck_id, generated_sentence_id, archived_sentence_id, term_id, term, definition, is_new)
+SELECT id, deck_id, generated_sentence_id, archived_sentence_id, term_id, term, definition, is_new FROM sentence_terms;
+DROP TABLE sentence_terms;
+ALTER TABLE sentence_terms_new RENAME TO sentence_terms;
+CREATE INDEX ix_sentence_terms_generated_sentence_id ON sentence_terms(generated_sentence_id);
+CREATE INDEX ix_sentence_terms_archived_sentence_id ON sentence_terms(archived_sentence_id);
+CREATE INDEX ix_sentence_terms_term_id ON sentence_terms(term_id);
+CREATE INDEX idx_sentence_terms_deck_term ON sentence_terms(deck_id, term);
+
+CREATE TABLE user_term_data_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    term_id INTEGER NOT NULL,
+    last_reviewed TIMESTAMP,
+    next_review TIMESTAMP,
+    ease_factor REAL DEFAULT 2.5,
+    interval INTEGER DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE CASCADE,
+    UNIQUE(user_id, term_id)
+);
+INSERT INTO user_term_data_new (id, user_id, term_id, last_reviewed, next_review, ease_factor, interval)
+SELECT id, user_id, term_id, last_reviewed, next_review, ease_factor, interval FROM user_term_data;
+DROP TABLE user_term_data;
+ALTER TABLE user_term_data_new RENAME TO user_term_data;
+CREATE INDEX idx_user_term_data ON user_term_data(user_id, term_id);
+CREATE INDEX idx_user_term_next_review ON user_term_data(user_id, next_review);
+CREATE INDEX ix_user_term_data_term_id ON user_term_data(term_id);
+
+CREATE TABLE review_history_new (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    term_id INTEGER NOT NULL,
+    review_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    rating INTEGER NOT NULL,
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (term_id) REFERENCES terms(term_id) ON DELETE CASCADE
+);
+INSERT INTO review_history_new (id, user_id, term_id, review_date, rating)
+SELECT id, user_id, term_id, review_date, rating FROM review_history;
+DROP TABLE review_history;
+ALTER TABLE review_history_new RENAME TO review_history;
+CREATE INDEX idx_review_history ON review_history(user_id, term_id);
+CREATE INDEX ix_review_history_term_id ON review_history(term_id);
+
+CREATE TABLE review_daily_stats_new (
+    user_id INTEGER NOT NULL,
+    deck_id INTEGER NOT NULL,
+    review_day DATE NOT NULL,
+    rating INTEGER NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, deck_id, review_day, rating),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE CASCADE
+);
+INSERT INTO review_daily_stats_new (user_id, deck_id, review_day, rating, review_count)
+SELECT user_id, deck_id, review_day, rating, review_count FROM review_daily_stats;
+DROP TABLE review_daily_stats;
+ALTER TABLE review_daily_stats_new RENAME TO review_daily_stats;
+CREATE INDEX idx_review_daily_stats_user_day ON review_daily_stats(user_id, review_day);
+CREATE INDEX ix_review_daily_stats_deck_id ON review_daily_stats(deck_id);
+
+CREATE TABLE jobs_new (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_type TEXT NOT NULL,
+    deck_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    result_json TEXT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    FOREIGN KEY (deck_id) REFERENCES decks(deck_id) ON DELETE SET NULL
+);
+INSERT INTO jobs_new (job_id, job_type, deck_id, status, result_json, error, created_at, started_at, finished_at)
+SELECT job_id, job_type, deck_id, status, result_json, error, created_at, started_at, finished_at FROM jobs;
+DROP TABLE jobs;
+ALTER TABLE jobs_new RENAME TO jobs;
+CREATE INDEX ix_jobs_deck_id ON jobs(deck_id);
+
+DELETE FROM sqlite_sequence WHERE name IN (SELECT name FROM saved_sequence);
+INSERT INTO sqlite_sequence (name, seq) SELECT name, seq FROM saved_sequence;
+DROP TABLE saved_sequence;
+
+COMMIT;
+
+PRAGMA foreign_keys = ON;
+PRAGMA foreign_key_check;
@@ -1,16 +1,32 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from config import Config
+from src.llm import init_llm
+from src.metrics import init_metrics
+from src.serializers import FastJSONProvider
+from src.storage import RoutingSession, configure_storage, init_storage
 import os
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(config_class)
 
+    configure_storage(app)
     db.init_app(app)
+    init_storage(app, db)
+    init_metrics(app, db)
+    init_llm(app)
+
+    # Import models, so they can't be imported before db exists
+    from src.analytics import init_analytics
+    from src.deletion import init_deletion
+
+    init_analytics(app)
+    init_deletion(app)
 
     from src.endpoints.users import users_bp
     from src.endpoints.decks import decks_bp
@@ -18,6 +34,8 @@ def create_app(config_class=Config):
     from src.endpoints.prompts import prompts_bp
     from src.endpoints.sentences import sentences_bp
     from src.endpoints.anki import anki_bp
+    from src.endpoints.jobs import jobs_bp
+    from src.endpoints.metrics import metrics_bp
 
     app.register_blueprint(users_bp, url_prefix="/")
     app.register_blueprint(decks_bp, url_prefix="/")
@@ -25,5 +43,7 @@ def create_app(config_class=Config):
     app.register_blueprint(prompts_bp, url_prefix="/")
     app.register_blueprint(sentences_bp, url_prefix="/")
     app.register_blueprint(anki_bp, url_prefix="/")
+    app.register_blueprint(jobs_bp, url_prefix="/")
+    app.register_blueprint(metrics_bp, url_prefix="/")
 
     return app
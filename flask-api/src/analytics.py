@@ -0,0 +1,160 @@
+from src import db
+from src.models import ReviewDailyStat, ReviewHistory, Term, UserTermData
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from datetime import date, timedelta
+import click
+
+# Ratings that count as remembering the card (Good, Easy)
+RECALLED_RATINGS = (3, 4)
+
+
+def record_review(user_id, deck_id, reviewed_at, rating):
+    # Joins the caller's transaction; the caller commits
+    statement = insert(ReviewDailyStat).values(
+        user_id=user_id,
+        deck_id=deck_id,
+        review_day=reviewed_at.date(),
+        rating=rating,
+        review_count=1,
+    )
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["user_id", "deck_id", "review_day", "rating"],
+            set_={
+                "review_count": ReviewDailyStat.review_count
+                + statement.excluded.review_count
+            },
+        )
+    )
+
+
+def rebuild_review_stats(user_id):
+    # Replaces the user's rollup rows with a fresh aggregate of their history
+    review_day = func.date(ReviewHistory.review_date)
+    aggregate = (
+        select(
+            ReviewHistory.user_id,
+            Term.deck_id,
+            review_day,
+            ReviewHistory.rating,
+            func.count(),
+        )
+        .join(Term, Term.term_id == ReviewHistory.term_id)
+        .where(ReviewHistory.user_id == user_id)
+        .group_by(ReviewHistory.user_id, Term.deck_id, review_day, ReviewHistory.rating)
+    )
+
+    db.session.execute(
+        delete(ReviewDailyStat).where(ReviewDailyStat.user_id == user_id)
+    )
+    result = db.session.execute(
+        insert(ReviewDailyStat).from_select(
+            ["user_id", "deck_id", "review_day", "rating", "review_count"], aggregate
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def review_summary(user_id, days, deck_id=None):
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+
+    stats = db.session.query(ReviewDailyStat).filter(ReviewDailyStat.user_id == user_id)
+    if deck_id is not None:
+        stats = stats.filter(ReviewDailyStat.deck_id == deck_id)
+
+    per_day = dict(
+        stats.with_entities(
+            ReviewDailyStat.review_day, func.sum(ReviewDailyStat.review_count)
+        )
+        .filter(ReviewDailyStat.review_day >= start)
+        .group_by(ReviewDailyStat.review_day)
+    )
+    per_rating = dict(
+        stats.with_entities(
+            ReviewDailyStat.rating, func.sum(ReviewDailyStat.review_count)
+        )
+        .filter(ReviewDailyStat.review_day >= start)
+        .group_by(ReviewDailyStat.rating)
+    )
+    review_days = [
+        row[0]
+        for row in stats.with_entities(ReviewDailyStat.review_day)
+        .distinct()
+        .order_by(ReviewDailyStat.review_day)
+    ]
+
+    dates = [start + timedelta(days=day) for day in range(days)]
+    total = sum(per_rating.values())
+    current_streak, longest_streak = review_streaks(review_days, today)
+
+    return {
+        "dates": [day.isoformat() for day in dates],
+        "reviews": [per_day.get(day, 0) for day in dates],
+        "total_reviews": total,
+        "ratings": {
+            rating: {
+                "count": per_rating.get(rating, 0),
+                "share": per_rating.get(rating, 0) / total if total else 0.0,
+            }
+            for rating in range(1, 5)
+        },
+        "retention": (
+            sum(per_rating.get(rating, 0) for rating in RECALLED_RATINGS) / total
+            if total
+            else None
+        ),
+        "ease_distribution": ease_distribution(user_id, deck_id),
+        "streak": {"current": current_streak, "longest": longest_streak},
+    }
+
+
+def ease_distribution(user_id, deck_id=None):
+    # Current state rather than history, so this stays bounded by the number
+    # of cards and reads user_term_data directly
+    bucket = func.round(UserTermData.ease_factor, 1)
+    query = db.session.query(bucket, func.count()).filter(
+        UserTermData.user_id == user_id, UserTermData.ease_factor != None
+    )
+    if deck_id is not None:
+        query = query.join(Term, Term.term_id == UserTermData.term_id).filter(
+            Term.deck_id == deck_id
+        )
+    return [
+        {"easeFactor": ease_factor, "cards": cards}
+        for ease_factor, cards in query.group_by(bucket).order_by(bucket)
+    ]
+
+
+def review_streaks(review_days, today):
+    # review_days are distinct dates in ascending order; the current streak
+    # survives until the end of the day after the last review
+    longest = run = 0
+    previous = None
+    for day in review_days:
+        run = run + 1 if previous == day - timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+
+    current = run if previous and previous >= today - timedelta(days=1) else 0
+    return current, longest
+
+
+def init_analytics(app):
+    @app.cli.command("backfill-review-stats")
+    @click.option("--user-id", type=int, help="Only rebuild this user's stats.")
+    def backfill_review_stats(user_id):
+        """Rebuild review_daily_stats from review_history."""
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = [
+                row[0] for row in db.session.query(ReviewHistory.user_id).distinct()
+            ]
+
+        # One transaction per user keeps the write lock short on a live DB
+        for index, user_id in enumerate(user_ids, 1):
+            rows = rebuild_review_stats(user_id)
+            click.echo(f"[{index}/{len(user_ids)}] user {user_id}: {rows} rows")
@@ -0,0 +1,237 @@
+"""Read-through cache of deck metadata and term lists.
+
+Generation, the card endpoints and the term listing read the same deck and
+its full term list many times a minute, while the terms change a few times
+a day. The write paths call `invalidate_terms` or `invalidate_deck` after
+committing.
+
+A cache miss can race a write: the reader queries the old terms, the writer
+commits and invalidates, then the reader stores what it read. Each key has
+a generation that invalidation bumps, and a value is only stored if the
+generation is the one seen before the query, so a stale value never lands.
+Misses load on a connection of their own, whose snapshot starts with the
+query rather than with the request's first statement.
+
+DECK_CACHE_BACKEND picks where entries live: "memory" is a per-process LRU
+(DECK_CACHE_SIZE 0 turns it off), "sqlite" a small database file that every
+worker process shares and invalidates, at the cost of a lookup and a JSON
+decode per hit.
+"""
+
+from flask import abort, current_app
+from src import db
+from src.cache import LRUCache
+from src.models import Deck, Term, User
+from src.serializers import DECK_FIELDS, TERM_LIST_FIELDS, columns
+from sqlalchemy import select
+from collections import namedtuple
+from datetime import datetime
+import json, sqlite3, threading
+
+# What the cache holds for a deck; the owner's username is on the deck pages
+CachedDeck = namedtuple("CachedDeck", DECK_FIELDS + ("username",))
+# Same fields as a columns(Term, TERM_LIST_FIELDS) row, so serialize_many
+# takes its positional fast path on these too
+CachedTerm = namedtuple("CachedTerm", TERM_LIST_FIELDS)
+
+BACKENDS = ("memory", "sqlite")
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class MemoryStore:
+    # Holds the values themselves; callers get the cached tuples back
+    encodes = False
+
+    def __init__(self, maxsize, ttl=None):
+        self.entries = LRUCache(maxsize=maxsize, ttl=ttl)
+        # One int per deck ever invalidated in this process
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # (value or None, generation to pass back to set)
+        with self.lock:
+            return self.entries.get(key), self.generations.get(key, 0)
+
+    def set(self, key, value, generation):
+        with self.lock:
+            if self.generations.get(key, 0) == generation:
+                self.entries.set(key, value)
+
+    def invalidate(self, key):
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            self.entries.delete(key)
+
+
+class SQLiteStore:
+    """Entries in a SQLite file shared by the worker processes.
+
+    Holds at most a deck and a term list per deck, so it isn't bounded
+    further. Values are JSON, with datetimes as ISO 8601 strings.
+    """
+
+    encodes = True
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self.connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS deck_cache ("
+                "key TEXT PRIMARY KEY, "
+                "generation INTEGER NOT NULL DEFAULT 0, "
+                "value TEXT)"
+            )
+
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # Losing entries on a crash only costs a few cache misses
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = OFF")
+            self.local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = (
+            self.connection()
+            .execute("SELECT value, generation FROM deck_cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None:
+            return None, 0
+        value, generation = row
+        return (json.loads(value) if value is not None else None), generation
+
+    def set(self, key, value, generation):
+        self.connection().execute(
+            "INSERT INTO deck_cache (key, generation, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value "
+            "WHERE deck_cache.generation = excluded.generation",
+            (key, generation, json.dumps(value, default=datetime.isoformat)),
+        )
+
+    def invalidate(self, key):
+        self.connection().execute(
+            "INSERT INTO deck_cache (key, generation, value) VALUES (?, 1, NULL) "
+            "ON CONFLICT (key) DO UPDATE SET generation = generation + 1, "
+            "value = NULL",
+            (key,),
+        )
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = current_app.config.get("DECK_CACHE_BACKEND", "memory")
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown DECK_CACHE_BACKEND {backend!r}")
+            if backend == "sqlite":
+                _store = SQLiteStore(current_app.config["DECK_CACHE_PATH"])
+            else:
+                _store = MemoryStore(
+                    maxsize=current_app.config.get("DECK_CACHE_SIZE", 256),
+                    ttl=current_app.config.get("DECK_CACHE_TTL"),
+                )
+    return _store
+
+
+def read_through(key, load, encode, decode):
+    store = get_store()
+    value, generation = store.get(key)
+    if value is not None:
+        return decode(value) if store.encodes else value
+
+    # The session's bind, so @read_only requests still use the read pool
+    with db.session.get_bind().connect() as connection:
+        value = load(connection)
+    if value is not None:
+        store.set(key, encode(value) if store.encodes else value, generation)
+    return value
+
+
+def load_deck(connection, deck_id):
+    row = connection.execute(
+        select(*columns(Deck, DECK_FIELDS), User.username)
+        .join(User, User.user_id == Deck.user_id)
+        .where(Deck.deck_id == deck_id, Deck.deleted_at.is_(None))
+    ).first()
+    return CachedDeck._make(row) if row is not None else None
+
+
+def decode_deck(value):
+    deck = CachedDeck._make(value)
+    return deck._replace(created_at=parse_datetime(deck.created_at))
+
+
+def load_terms(connection, deck_id):
+    return tuple(
+        map(
+            CachedTerm._make,
+            connection.execute(
+                select(*columns(Term, TERM_LIST_FIELDS))
+                .where(Term.deck_id == deck_id)
+                .order_by(Term.term_id)
+            ),
+        )
+    )
+
+
+def decode_terms(value):
+    return tuple(
+        term._replace(created_at=parse_datetime(term.created_at))
+        for term in map(CachedTerm._make, value)
+    )
+
+
+def parse_datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def cached_deck(deck_id):
+    """The deck's metadata as a CachedDeck, or None if there is no such deck."""
+    return read_through(
+        f"deck:{deck_id}",
+        lambda connection: load_deck(connection, deck_id),
+        list,
+        decode_deck,
+    )
+
+
+def cached_deck_or_404(deck_id):
+    deck = cached_deck(deck_id)
+    if deck is None:
+        abort(404)
+    return deck
+
+
+def cached_terms(deck_id):
+    """The deck's terms as CachedTerms in term_id order.
+
+    Doesn't check that the deck exists; look it up first.
+    """
+    return read_through(
+        f"terms:{deck_id}",
+        lambda connection: load_terms(connection, deck_id),
+        lambda terms: [list(term) for term in terms],
+        decode_terms,
+    )
+
+
+def invalidate_terms(*deck_ids):
+    # After the commit, so a concurrent miss can't store the old terms again
+    store = get_store()
+    for deck_id in set(deck_ids):
+        store.invalidate(f"terms:{deck_id}")
+
+
+def invalidate_deck(*deck_ids):
+    store = get_store()
+    for deck_id in set(deck_ids):
+        store.invalidate(f"deck:{deck_id}")
+        store.invalidate(f"terms:{deck_id}")
@@ -0,0 +1,130 @@
+from flask import current_app
+from src import db
+from src.deck_cache import invalidate_deck
+from src.models import (
+    ArchivedSentence,
+    Deck,
+    GeneratedSentence,
+    ReviewHistory,
+    Term,
+    UserTermData,
+)
+from src.storage import RoutingSession
+from sqlalchemy import delete, event, select
+from sqlalchemy.orm import with_loader_criteria
+import click
+import time
+
+
+def hide_deleted_decks(orm_execute_state):
+    """Leave soft-deleted decks out of every ORM query that selects decks.
+
+    Queries that need them anyway (the purge) set the `include_deleted`
+    execution option. Lazy loads of an already loaded object's deck are left
+    alone, so a term still resolves its deck while the purge is running.
+    """
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and not orm_execute_state.is_relationship_load
+        and not orm_execute_state.execution_options.get("include_deleted", False)
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            with_loader_criteria(Deck, Deck.deleted_at.is_(None), include_aliases=True)
+        )
+
+
+def purge_batches(deck_id):
+    # (name, model, key, criteria) in delete order. Deleting a sentence or term
+    # cascades to its links, so the biggest child tables go first, in their
+    # own batches, and each cascade stays small
+    deck_terms = select(Term.term_id).where(Term.deck_id == deck_id)
+    return [
+        (
+            "generated_sentences",
+            GeneratedSentence,
+            GeneratedSentence.id,
+            GeneratedSentence.deck_id == deck_id,
+        ),
+        (
+            "archived_sentences",
+            ArchivedSentence,
+            ArchivedSentence.id,
+            ArchivedSentence.deck_id == deck_id,
+        ),
+        (
+            "review_history",
+            ReviewHistory,
+            ReviewHistory.id,
+            ReviewHistory.term_id.in_(deck_terms),
+        ),
+        (
+            "user_term_data",
+            UserTermData,
+            UserTermData.id,
+            UserTermData.term_id.in_(deck_terms),
+        ),
+        ("terms", Term, Term.term_id, Term.deck_id == deck_id),
+    ]
+
+
+def purge_deck(deck_id):
+    """Delete a soft-deleted deck's rows, then the deck itself.
+
+    Each batch commits on its own so the write lock is only held for
+    DECK_PURGE_BATCH_SIZE rows at a time, and other writers get a turn in
+    the DECK_PURGE_PAUSE between batches. Safe to rerun after an interruption.
+    """
+    batch_size = current_app.config.get("DECK_PURGE_BATCH_SIZE", 500)
+    pause = current_app.config.get("DECK_PURGE_PAUSE", 0)
+
+    deleted = {}
+    for name, model, key, criteria in purge_batches(deck_id):
+        deleted[name] = 0
+        while True:
+            result = db.session.execute(
+                delete(model).where(
+                    key.in_(select(key).where(criteria).limit(batch_size))
+                ),
+                execution_options={"synchronize_session": False},
+            )
+            db.session.commit()
+            deleted[name] += result.rowcount
+            if result.rowcount < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+    # What's left (links, rollup rows) cascades from the deck row
+    db.session.execute(
+        delete(Deck).where(Deck.deck_id == deck_id),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.commit()
+    invalidate_deck(deck_id)
+    return {"deck_id": deck_id, "deleted": deleted}
+
+
+def deleted_deck_ids():
+    return [
+        row[0]
+        for row in db.session.query(Deck.deck_id)
+        .filter(Deck.deleted_at.isnot(None))
+        .order_by(Deck.deck_id)
+        .execution_options(include_deleted=True)
+    ]
+
+
+def init_deletion(app):
+    # Listeners are per class, and create_app may run more than once
+    if not event.contains(RoutingSession, "do_orm_execute", hide_deleted_decks):
+        event.listen(RoutingSession, "do_orm_execute", hide_deleted_decks)
+
+    @app.cli.command("purge-deleted-decks")
+    def purge_deleted_decks():
+        """Finish purging soft-deleted decks, e.g. after a restart."""
+        deck_ids = deleted_deck_ids()
+        for index, deck_id in enumerate(deck_ids, 1):
+            result = purge_deck(deck_id)
+            rows = sum(result["deleted"].values())
+            click.echo(f"[{index}/{len(deck_ids)}] deck {deck_id}: {rows} rows")
@@ -1,11 +1,20 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src import db
-from src.models import ReviewHistory, Term, UserTermData, Deck
-from sqlalchemy import func
+from src.analytics import record_review, review_summary
+from src.deck_cache import cached_deck_or_404, cached_terms
+from src.etags import bump_deck_version
+from src.models import ReviewDailyStat, ReviewHistory, Term, UserTermData, Deck, User
+from src.srs import rating_distribution, simulate_review_load
+from src.storage import read_only
+from sqlalchemy import func, tuple_
 from datetime import datetime, timedelta, time
+import numpy as np
 
 anki_bp = Blueprint("anki", __name__)
 
+DUE_CARD_BATCH_SIZE = 100
+MAX_DUE_CARD_BATCH_SIZE = 1000
+
 
 def calculate_next_interval(rating, current_interval, ease_factor):
     if rating < 1 or rating > 4:
@@ -49,48 +58,198 @@ def update_ease_factor(rating, current_ease_factor):
         return max(1.3, current_ease_factor - 0.2)
 
 
-def get_due_cards(user_id, deck_id):
-    now = datetime.now()
-    today = now.date()
-
+def clamp_ease_factor(ease_factor):
+    # The card's ease comes back from the client; keep it in update_ease_factor's range
+    return min(max(ease_factor, 1.3), 2.5)
+
+
+def format_card(term, user_term_data, today):
+    return {
+        "term_id": term.term_id,
+        "term": term.term,
+        "definition": term.definition,
+        "nextReview": (
+            user_term_data.next_review.isoformat()
+            if user_term_data and user_term_data.next_review
+            else datetime.combine(today, time.min).isoformat()
+        ),
+        "easeFactor": user_term_data.ease_factor if user_term_data else 2.5,
+        "interval": user_term_data.interval if user_term_data else 0,
+    }
+
+
+def parse_due_cursor(cursor):
+    # Cursors are "new|<term_id>" while serving unseen cards and
+    # "due|<next_review>|<term_id>" once we have moved on to scheduled ones
+    if not cursor:
+        return None, None, None
+    parts = cursor.split("|")
+    if parts[0] == "new" and len(parts) == 2:
+        return "new", None, int(parts[1])
+    if parts[0] == "due" and len(parts) == 3:
+        return "due", datetime.fromisoformat(parts[1]), int(parts[2])
+    raise ValueError("Invalid cursor")
+
+
+def get_due_cards(user_id, deck_id, limit=None, cursor=None):
+    today = datetime.now().date()
+    tomorrow = datetime.combine(today + timedelta(days=1), time.min)
+    phase, after_review, after_term_id = parse_due_cursor(cursor)
+
+    cards = []
+    next_cursor = None
+
+    # Unseen cards first, walked in term_id order
+    if phase in (None, "new"):
+        new_cards = (
+            db.session.query(Term, UserTermData)
+            .outerjoin(
+                UserTermData,
+                (Term.term_id == UserTermData.term_id)
+                & (UserTermData.user_id == user_id),
+            )
+            .filter(Term.deck_id == deck_id, UserTermData.next_review == None)
+            .order_by(Term.term_id)
+        )
+        if after_term_id is not None:
+            new_cards = new_cards.filter(Term.term_id > after_term_id)
+        if limit is not None:
+            new_cards = new_cards.limit(limit + 1)
+        cards = new_cards.all()
+
+        if limit is not None and len(cards) > limit:
+            cards = cards[:limit]
+            return [format_card(*card, today) for card in cards], (
+                f"new|{cards[-1][0].term_id}"
+            )
+        after_review, after_term_id = None, None
+
+    # Then scheduled cards as a range scan over (user_id, next_review)
+    remaining = None if limit is None else limit - len(cards)
     due_cards = (
         db.session.query(Term, UserTermData)
+        .join(UserTermData, Term.term_id == UserTermData.term_id)
+        .filter(
+            UserTermData.user_id == user_id,
+            UserTermData.next_review < tomorrow,
+            Term.deck_id == deck_id,
+        )
+        .order_by(UserTermData.next_review, UserTermData.term_id)
+    )
+    if after_review is not None:
+        due_cards = due_cards.filter(
+            tuple_(UserTermData.next_review, UserTermData.term_id)
+            > tuple_(after_review, after_term_id)
+        )
+    if remaining is not None:
+        due_cards = due_cards.limit(remaining + 1)
+    due_cards = due_cards.all()
+
+    if remaining is not None and len(due_cards) > remaining:
+        due_cards = due_cards[:remaining]
+        if due_cards:
+            last = due_cards[-1][1]
+            next_cursor = f"due|{last.next_review.isoformat()}|{last.term_id}"
+        else:
+            next_cursor = f"new|{cards[-1][0].term_id}"
+
+    return [format_card(*card, today) for card in cards + due_cards], next_cursor
+
+
+def count_due_cards(user_id, deck_id):
+    tomorrow = datetime.combine(datetime.now().date() + timedelta(days=1), time.min)
+    return (
+        db.session.query(func.count(Term.term_id))
         .outerjoin(
             UserTermData,
             (Term.term_id == UserTermData.term_id) & (UserTermData.user_id == user_id),
         )
         .filter(Term.deck_id == deck_id)
         .filter(
-            (func.date(UserTermData.next_review) <= today)
-            | (UserTermData.next_review == None)
+            (UserTermData.next_review == None) | (UserTermData.next_review < tomorrow)
         )
-        .order_by(func.coalesce(UserTermData.next_review, datetime.min))
-        .all()
+        .scalar()
     )
 
-    return [
-        {
-            "term_id": term.term_id,
-            "term": term.term,
-            "definition": term.definition,
-            "nextReview": (
-                user_term_data.next_review.isoformat()
-                if user_term_data and user_term_data.next_review
-                else datetime.combine(today, time.min).isoformat()
-            ),
-            "easeFactor": user_term_data.ease_factor if user_term_data else 2.5,
-            "interval": user_term_data.interval if user_term_data else 0,
-        }
-        for term, user_term_data in due_cards
-    ]
+
+def parse_queue_args():
+    limit = request.args.get("limit", DUE_CARD_BATCH_SIZE, type=int)
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    return min(limit, MAX_DUE_CARD_BATCH_SIZE), request.args.get("cursor")
+
+
+def forecast_review_load(rows, rating_counts, days, seed=None):
+    # rows are (group_key, next_review, interval, ease_factor) tuples. Returns
+    # dates, {group_key: mean reviews per day} and whether the run was cut short
+    now = datetime.now()
+    midnight = datetime.combine(now.date(), time.min)
+    day_offset = (now - midnight).total_seconds() / 86400
+
+    group_keys = sorted({row[0] for row in rows})
+    group_index = {key: index for index, key in enumerate(group_keys)}
+
+    groups = np.fromiter((group_index[row[0]] for row in rows), np.int64, len(rows))
+    due_in = np.fromiter(
+        ((row[1] - now).total_seconds() / 86400 if row[1] else 0.0 for row in rows),
+        float,
+        len(rows),
+    )
+    intervals = np.fromiter(
+        (row[2] if row[2] is not None else 0 for row in rows), float, len(rows)
+    )
+    ease_factors = np.fromiter(
+        (row[3] if row[3] is not None else 2.5 for row in rows), float, len(rows)
+    )
+
+    counts, truncated = simulate_review_load(
+        due_in,
+        intervals,
+        ease_factors,
+        groups,
+        len(group_keys),
+        days,
+        day_offset=day_offset,
+        rating_probabilities=rating_distribution(rating_counts),
+        seed=seed,
+        runs=current_app.config.get("FORECAST_RUNS", 4),
+    )
+    dates = [(now.date() + timedelta(days=day)).isoformat() for day in range(days)]
+    counts = np.round(counts, 2)
+
+    return (
+        dates,
+        {key: counts[index].tolist() for key, index in group_index.items()},
+        truncated,
+    )
+
+
+def parse_stats_args():
+    days = request.args.get("days", 30, type=int)
+    if days < 1 or days > 365:
+        raise ValueError("days must be between 1 and 365")
+    return days
+
+
+def parse_forecast_args():
+    days = request.args.get("days", 30, type=int)
+    seed = request.args.get("seed", type=int)
+    if days < 1 or days > 365:
+        raise ValueError("days must be between 1 and 365")
+    return days, seed
 
 
 @anki_bp.route("/decks/<int:deck_id>/anki/initialize", methods=["POST"])
 def initialize_anki_deck(deck_id):
     user_id = 1  # TODO: Replace with actual user authentication
-    deck = Deck.query.get_or_404(deck_id)
-    card_queue = get_due_cards(user_id, deck_id)
-    total_cards = Term.query.filter_by(deck_id=deck_id).count()
+    deck = cached_deck_or_404(deck_id)
+
+    try:
+        limit, cursor = parse_queue_args()
+        card_queue, next_cursor = get_due_cards(user_id, deck_id, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    total_cards = len(cached_terms(deck_id))
 
     return jsonify(
         {
@@ -99,10 +258,11 @@ def initialize_anki_deck(deck_id):
                 "deck_name": deck.deck_name,
             },
             "cardQueue": card_queue,
+            "nextCursor": next_cursor,
             "progress": {
                 "reviewed": 0,
                 "total": total_cards,
-                "dueCount": len(card_queue),
+                "dueCount": count_due_cards(user_id, deck_id),
             },
         }
     )
@@ -112,6 +272,11 @@ def initialize_anki_deck(deck_id):
 def rate_anki_card():
     user_id = 1  # TODO: Replace with actual user authentication
     data = request.json
+    now = datetime.now()
+
+    term = Term.query.get_or_404(data["term_id"])
+    # A term keeps loading while its deck is soft-deleted and being purged
+    cached_deck_or_404(term.deck_id)
 
     user_term_data = UserTermData.query.filter_by(
         user_id=user_id, term_id=data["term_id"]
@@ -120,17 +285,24 @@ def rate_anki_card():
         user_term_data = UserTermData(user_id=user_id, term_id=data["term_id"])
         db.session.add(user_term_data)
 
-    user_term_data.last_reviewed = datetime.now()
+    ease_factor = clamp_ease_factor(data["easeFactor"])
+    user_term_data.last_reviewed = now
     user_term_data.interval = calculate_next_interval(
-        data["rating"], data["interval"], data["easeFactor"]
+        data["rating"], data["interval"], ease_factor
     )
-    user_term_data.ease_factor = update_ease_factor(data["rating"], data["easeFactor"])
+    user_term_data.ease_factor = update_ease_factor(data["rating"], ease_factor)
     user_term_data.next_review = get_next_review_date(user_term_data.interval)
 
     review_history = ReviewHistory(
-        user_id=user_id, term_id=data["term_id"], rating=data["rating"]
+        user_id=user_id,
+        term_id=data["term_id"],
+        review_date=now,
+        rating=data["rating"],
     )
     db.session.add(review_history)
+    record_review(user_id, term.deck_id, now, data["rating"])
+    # Due counts are part of the deck payloads
+    bump_deck_version(term.deck_id)
 
     db.session.commit()
 
@@ -144,11 +316,16 @@ def rate_anki_card():
 
 
 @anki_bp.route("/decks/<int:deck_id>/anki/load-more-cards", methods=["GET"])
+@read_only
 def load_more_cards(deck_id):
     user_id = 1  # TODO: Replace with actual user authentication
 
-    card_queue = get_due_cards(user_id, deck_id)
-    total_cards = Term.query.filter_by(deck_id=deck_id).count()
+    try:
+        limit, cursor = parse_queue_args()
+        card_queue, next_cursor = get_due_cards(user_id, deck_id, limit, cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    total_cards = len(cached_terms(deck_id))
     reviewed_cards = (
         UserTermData.query.join(Term)
         .filter(
@@ -162,10 +339,11 @@ def load_more_cards(deck_id):
     return jsonify(
         {
             "cardQueue": card_queue,
+            "nextCursor": next_cursor,
             "progress": {
                 "reviewed": reviewed_cards,
                 "total": total_cards,
-                "dueCount": len(card_queue),
+                "dueCount": count_due_cards(user_id, deck_id),
             },
         }
     )
@@ -191,13 +369,19 @@ def reset_anki_progress(deck_id):
                 db.session.query(Term.term_id).filter_by(deck_id=deck_id)
             ),
         ).delete(synchronize_session=False)
+        ReviewDailyStat.query.filter_by(user_id=user_id, deck_id=deck_id).delete(
+            synchronize_session=False
+        )
+        bump_deck_version(deck_id)
 
         db.session.commit()
 
         # Re-initialize the deck
-        deck = Deck.query.get_or_404(deck_id)
-        card_queue = get_due_cards(user_id, deck_id)
-        total_cards = Term.query.filter_by(deck_id=deck_id).count()
+        deck = cached_deck_or_404(deck_id)
+        card_queue, next_cursor = get_due_cards(
+            user_id, deck_id, limit=DUE_CARD_BATCH_SIZE
+        )
+        total_cards = len(cached_terms(deck_id))
 
         return jsonify(
             {
@@ -207,10 +391,11 @@ def reset_anki_progress(deck_id):
                     "deck_name": deck.deck_name,
                 },
                 "cardQueue": card_queue,
+                "nextCursor": next_cursor,
                 "progress": {
                     "reviewed": 0,
                     "total": total_cards,
-                    "dueCount": len(card_queue),
+                    "dueCount": total_cards,
                 },
             }
         )
@@ -240,3 +425,148 @@ def get_next_intervals():
         }
 
     return jsonify({"nextIntervals": next_intervals})
+
+
+@anki_bp.route("/decks/<int:deck_id>/anki/forecast", methods=["GET"])
+@read_only
+def get_deck_forecast(deck_id):
+    user_id = 1  # TODO: Replace with actual user authentication
+    deck = Deck.query.get_or_404(deck_id)
+
+    try:
+        days, seed = parse_forecast_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = (
+        db.session.query(
+            Term.deck_id,
+            UserTermData.next_review,
+            UserTermData.interval,
+            UserTermData.ease_factor,
+        )
+        .outerjoin(
+            UserTermData,
+            (Term.term_id == UserTermData.term_id) & (UserTermData.user_id == user_id),
+        )
+        .filter(Term.deck_id == deck_id)
+        .all()
+    )
+    rating_counts = (
+        db.session.query(ReviewHistory.rating, func.count())
+        .join(Term, Term.term_id == ReviewHistory.term_id)
+        .filter(ReviewHistory.user_id == user_id, Term.deck_id == deck_id)
+        .group_by(ReviewHistory.rating)
+        .all()
+    )
+
+    dates, counts, truncated = forecast_review_load(rows, rating_counts, days, seed)
+
+    return jsonify(
+        {
+            "deck_id": deck.deck_id,
+            "deck_name": deck.deck_name,
+            "dates": dates,
+            "reviews": counts.get(deck.deck_id, [0] * days),
+            "truncated": truncated,
+        }
+    )
+
+
+@anki_bp.route("/users/<int:user_id>/anki/forecast", methods=["GET"])
+@read_only
+def get_user_forecast(user_id):
+    user = User.query.get_or_404(user_id)
+
+    try:
+        days, seed = parse_forecast_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Every card the user has studied, plus unstudied terms in their own decks
+    rows = (
+        db.session.query(
+            Term.deck_id,
+            UserTermData.next_review,
+            UserTermData.interval,
+            UserTermData.ease_factor,
+        )
+        .join(Deck, Deck.deck_id == Term.deck_id)
+        .outerjoin(
+            UserTermData,
+            (Term.term_id == UserTermData.term_id) & (UserTermData.user_id == user_id),
+        )
+        .filter((Deck.user_id == user_id) | (UserTermData.id != None))
+        .all()
+    )
+    rating_counts = (
+        db.session.query(ReviewHistory.rating, func.count())
+        .filter(ReviewHistory.user_id == user_id)
+        .group_by(ReviewHistory.rating)
+        .all()
+    )
+
+    dates, counts, truncated = forecast_review_load(rows, rating_counts, days, seed)
+    deck_names = dict(
+        db.session.query(Deck.deck_id, Deck.deck_name).filter(
+            Deck.deck_id.in_(counts.keys())
+        )
+    )
+
+    return jsonify(
+        {
+            "user_id": user.user_id,
+            "username": user.username,
+            "dates": dates,
+            "reviews": [round(sum(day), 2) for day in zip(*counts.values())]
+            or [0] * days,
+            "decks": [
+                {
+                    "deck_id": deck_id,
+                    "deck_name": deck_names.get(deck_id),
+                    "reviews": reviews,
+                }
+                for deck_id, reviews in counts.items()
+            ],
+            "truncated": truncated,
+        }
+    )
+
+
+@anki_bp.route("/decks/<int:deck_id>/anki/stats", methods=["GET"])
+@read_only
+def get_deck_stats(deck_id):
+    user_id = 1  # TODO: Replace with actual user authentication
+    deck = Deck.query.get_or_404(deck_id)
+
+    try:
+        days = parse_stats_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {
+            "deck_id": deck.deck_id,
+            "deck_name": deck.deck_name,
+            **review_summary(user_id, days, deck_id=deck_id),
+        }
+    )
+
+
+@anki_bp.route("/users/<int:user_id>/anki/stats", methods=["GET"])
+@read_only
+def get_user_stats(user_id):
+    user = User.query.get_or_404(user_id)
+
+    try:
+        days = parse_stats_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(
+        {
+            "user_id": user.user_id,
+            "username": user.username,
+            **review_summary(user_id, days),
+        }
+    )
@@ -1,94 +1,130 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request, url_for
 from sqlalchemy import desc
 from src import db
-from src.models import ArchivedSentence, Deck, GeneratedSentence, User, Term
+from src.deck_cache import invalidate_deck
+from src.deletion import purge_deck
+from src.etags import (
+    deck_etag,
+    deck_list_etag,
+    etag_matches,
+    list_variant,
+    not_modified,
+    with_etag,
+)
+from src.jobs import enqueue_job
+from src.models import Deck, User
+from src.queries import deck_summary_query, keyset_page, page_args
+from src.serializers import DECK_FIELDS, serialize
+from src.storage import read_only
+from datetime import datetime
 
 decks_bp = Blueprint("decks", __name__)
 
+DECK_DELETE_MODES = ("soft", "hard")
+
+# Decks listed under their user leave out the user_id
+USER_DECK_FIELDS = tuple(field for field in DECK_FIELDS if field != "user_id")
+
+
+def serialize_deck(deck, term_count, due_count, fields=DECK_FIELDS):
+    return {**serialize(deck, fields), "term_count": term_count, "due_count": due_count}
+
+
+def user_deck_versions(user_id):
+    return (
+        db.session.query(Deck.deck_id, Deck.version)
+        .filter(Deck.user_id == user_id)
+        .order_by(Deck.deck_id)
+    )
+
 
 @decks_bp.route("/decks", methods=["GET"])
+@read_only
 def get_decks():
-    decks = Deck.query.all()
-    return jsonify(
-        [
-            {
-                "deck_id": deck.deck_id,
-                "user_id": deck.user_id,
-                "deck_name": deck.deck_name,
-                "user_language": deck.user_language,
-                "deck_language": deck.deck_language,
-                "is_public": deck.is_public,
-                "created_at": deck.created_at,
-                "term_count": Term.query.filter_by(deck_id=deck.deck_id).count(),
-            }
-            for deck in decks
-        ]
+    limit, cursor = page_args()
+
+    # Tagged from the (deck_id, version) pairs the page covers, including
+    # the extra row that decides next_cursor
+    versions = db.session.query(Deck.deck_id, Deck.version).order_by(Deck.deck_id)
+    if cursor is not None:
+        versions = versions.filter(Deck.deck_id > cursor)
+    versions = versions.limit(limit + 1)
+    etag = deck_list_etag("decks", versions, variant=list_variant(limit, cursor))
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    # Also push the cursor into the count subquery so earlier pages aren't aggregated
+    criteria = [Deck.deck_id > cursor] if cursor is not None else []
+    decks, next_cursor = keyset_page(
+        deck_summary_query(*criteria),
+        Deck.deck_id,
+        lambda row: row[0].deck_id,
+        limit,
+        cursor,
     )
+    response = jsonify(
+        {
+            "decks": [serialize_deck(*row) for row in decks],
+            "next_cursor": next_cursor,
+        }
+    )
+    return with_etag(response, etag)
 
 
 @decks_bp.route("/users/<int:user_id>/decks", methods=["GET"])
+@read_only
 def get_decks_by_user(user_id):
     user = User.query.get_or_404(user_id)
-    decks = Deck.query.filter_by(user_id=user_id).order_by(desc(Deck.created_at)).all()
-    return jsonify(
+    etag = deck_list_etag(f"user-decks-{user_id}", user_deck_versions(user_id))
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    decks = (
+        deck_summary_query(Deck.user_id == user_id)
+        .order_by(desc(Deck.created_at))
+        .all()
+    )
+    response = jsonify(
         {
             "user_id": user.user_id,
             "username": user.username,
-            "decks": [
-                {
-                    "deck_id": deck.deck_id,
-                    "deck_name": deck.deck_name,
-                    "user_language": deck.user_language,
-                    "deck_language": deck.deck_language,
-                    "is_public": deck.is_public,
-                    "created_at": deck.created_at.isoformat(),
-                    "term_count": Term.query.filter_by(deck_id=deck.deck_id).count(),
-                }
-                for deck in decks
-            ],
+            "decks": [serialize_deck(*row, fields=USER_DECK_FIELDS) for row in decks],
         }
     )
+    return with_etag(response, etag)
 
 
 @decks_bp.route("/users/<int:user_id>/decks/oldest", methods=["GET"])
+@read_only
 def get_decks_by_user_oldest_first(user_id):
     user = User.query.get_or_404(user_id)
-    decks = Deck.query.filter_by(user_id=user_id).order_by(Deck.created_at).all()
-    return jsonify(
+    etag = deck_list_etag(f"user-decks-oldest-{user_id}", user_deck_versions(user_id))
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    decks = deck_summary_query(Deck.user_id == user_id).order_by(Deck.created_at).all()
+    response = jsonify(
         {
             "user_id": user.user_id,
             "username": user.username,
-            "decks": [
-                {
-                    "deck_id": deck.deck_id,
-                    "deck_name": deck.deck_name,
-                    "user_language": deck.user_language,
-                    "deck_language": deck.deck_language,
-                    "is_public": deck.is_public,
-                    "created_at": deck.created_at.isoformat(),
-                    "term_count": Term.query.filter_by(deck_id=deck.deck_id).count(),
-                }
-                for deck in decks
-            ],
+            "decks": [serialize_deck(*row, fields=USER_DECK_FIELDS) for row in decks],
         }
     )
+    return with_etag(response, etag)
 
 
 @decks_bp.route("/decks/<int:deck_id>", methods=["GET"])
+@read_only
 def get_deck(deck_id):
-    deck = Deck.query.get_or_404(deck_id)
-    return jsonify(
-        {
-            "deck_id": deck.deck_id,
-            "user_id": deck.user_id,
-            "deck_name": deck.deck_name,
-            "user_language": deck.user_language,
-            "deck_language": deck.deck_language,
-            "is_public": deck.is_public,
-            "created_at": deck.created_at,
-            "term_count": Term.query.filter_by(deck_id=deck.deck_id).count(),
-        }
-    )
+    etag = deck_etag("deck", deck_id, daily=True)
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    deck, term_count, due_count = deck_summary_query(
+        Deck.deck_id == deck_id
+    ).first_or_404()
+    response = jsonify(serialize_deck(deck, term_count, due_count))
+    return with_etag(response, etag)
 
 
 @decks_bp.route("/decks", methods=["POST"])
@@ -103,45 +139,48 @@ def create_deck():
     )
     db.session.add(new_deck)
     db.session.commit()
-    return (
-        jsonify(
-            {
-                "deck_id": new_deck.deck_id,
-                "user_id": new_deck.user_id,
-                "deck_name": new_deck.deck_name,
-                "user_language": new_deck.user_language,
-                "deck_language": new_deck.deck_language,
-                "is_public": new_deck.is_public,
-                "created_at": new_deck.created_at.isoformat(),
-                "term_count": 0,
-            }
-        ),
-        201,
-    )
+    return jsonify(serialize_deck(new_deck, 0, 0)), 201
 
 
 @decks_bp.route("/decks/<int:deck_id>", methods=["DELETE"])
 def delete_deck(deck_id):
-    deck = Deck.query.get_or_404(deck_id)
+    mode = request.args.get("mode", current_app.config.get("DECK_DELETE_MODE", "soft"))
+    if mode not in DECK_DELETE_MODES:
+        return (
+            jsonify({"error": f"mode must be one of {', '.join(DECK_DELETE_MODES)}"}),
+            400,
+        )
 
-    # Delete associated terms
-    Term.query.filter_by(deck_id=deck_id).delete()
-
-    # Delete associated generated sentences
-    GeneratedSentence.query.filter_by(deck_id=deck_id).delete()
+    deck = Deck.query.get_or_404(deck_id)
 
-    # Delete associated archived sentences
-    ArchivedSentence.query.filter_by(deck_id=deck_id).delete()
+    if mode == "hard":
+        # Terms, sentences, links and review data go with it via ON DELETE
+        db.session.delete(deck)
+        db.session.commit()
+        invalidate_deck(deck_id)
+        return (
+            jsonify(
+                {
+                    "message": f"Deck {deck_id}, its terms, and associated sentences have been deleted"
+                }
+            ),
+            200,
+        )
 
-    # Delete the deck
-    db.session.delete(deck)
+    # Hidden from now on; the rows are purged in short batches in the background
+    deck.deleted_at = datetime.now()
     db.session.commit()
+    invalidate_deck(deck_id)
+    job = enqueue_job("purge_deck", purge_deck, deck_id, deck_id=deck_id)
 
     return (
         jsonify(
             {
-                "message": f"Deck {deck_id}, its terms, and associated sentences have been deleted"
+                "message": f"Deck {deck_id} has been deleted; its terms and sentences are being purged",
+                "job_id": job.job_id,
+                "status": job.status,
+                "status_url": url_for("jobs.get_job", job_id=job.job_id),
             }
         ),
-        200,
+        202,
     )
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from src.jobs import serialize_job
+from src.models import Job
+from src.storage import read_only
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/jobs/<int:job_id>", methods=["GET"])
+@read_only
+def get_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    return jsonify(serialize_job(job))
@@ -0,0 +1,9 @@
+from flask import Blueprint, Response
+from src.metrics import render_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
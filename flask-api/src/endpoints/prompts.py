@@ -1,19 +1,106 @@
-from flask import Blueprint, jsonify, request
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+    url_for,
+)
 from src import db
-from src.models import Deck, GeneratedSentence, Term
-from anthropic import Anthropic
-import os, re, random, json
+from src.deck_cache import cached_deck, cached_deck_or_404, cached_terms
+from src.etags import bump_deck_version
+from src.evaluation_cache import (
+    evaluation_cache_key,
+    get_cached_evaluation,
+    store_evaluation,
+)
+from src.jobs import enqueue_job, get_executor
+from src.llm import LLMUnavailableError, get_gateway, usage_summary
+from src.models import Deck, GeneratedSentence, SentenceTerm
+from src.serializers import serialize
+from src.term_selection import select_context_terms, select_key_terms, term_line
+from src.sentence_parser import SentenceParser, parse_sentences
+from sqlalchemy import select, update
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import re, json, threading
 
 prompts_bp = Blueprint("prompts", __name__)
 
-# Initialize Anthropic client
-anthropic = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+MODEL = "claude-3-5-sonnet-20240620"
+
+# What the translate endpoints return for an evaluated sentence
+EVALUATED_SENTENCE_FIELDS = (
+    "id",
+    "sentence",
+    "machine_translation",
+    "user_translation",
+    "evaluation_rating",
+    "evaluation_text",
+    "created_at",
+)
+
+# Pool refills in flight, and a per-deck counter bumped whenever pooled
+# sentences are discarded so in-flight refills don't save stale output
+_pool_refills = set()
+_pool_versions = {}
+_pool_lock = threading.Lock()
 
 
 @prompts_bp.route("/decks/<int:deck_id>/generate_sentences", methods=["POST"])
 def generate_sentences(deck_id):
-    deck = Deck.query.get_or_404(deck_id)
-    all_terms = Term.query.filter_by(deck_id=deck_id).all()
+    cached_deck_or_404(deck_id)
+
+    user_lang_given = request.args.get("user_lang_given", "false").lower() == "true"
+    sentence_count = int(request.args.get("count"))
+    run_async = request.args.get("async", "false").lower() == "true"
+
+    if not cached_terms(deck_id):
+        return jsonify({"error": "No terms found in this deck"}), 400
+
+    if run_async:
+        job = enqueue_job(
+            "generate_sentences",
+            generate_deck_sentences,
+            deck_id,
+            user_lang_given,
+            sentence_count,
+            deck_id=deck_id,
+        )
+        return (
+            jsonify(
+                {
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "status_url": url_for("jobs.get_job", job_id=job.job_id),
+                }
+            ),
+            202,
+        )
+
+    try:
+        return jsonify(
+            generate_deck_sentences(deck_id, user_lang_given, sentence_count)
+        )
+    except LLMUnavailableError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@prompts_bp.route(
+    "/decks/<int:deck_id>/generate_sentences/stream", methods=["GET", "POST"]
+)
+def stream_generated_sentences(deck_id):
+    deck = cached_deck_or_404(deck_id)
+    all_terms = cached_terms(deck_id)
 
     user_lang_given = request.args.get("user_lang_given", "false").lower() == "true"
     sentence_count = int(request.args.get("count"))
@@ -21,32 +108,92 @@ def generate_sentences(deck_id):
     if not all_terms:
         return jsonify({"error": "No terms found in this deck"}), 400
 
-    num_terms_to_emphasize = min(len(all_terms), sentence_count)
-    random.shuffle(all_terms)
-    emphasized_terms = all_terms[:num_terms_to_emphasize]
-    contextual_terms = all_terms[num_terms_to_emphasize:]
+    term_ids = term_id_map(all_terms)
+    first_prompt, all_term_set = build_generation_prompt(
+        deck, all_terms, sentence_count
+    )
+
+    parser = SentenceParser(all_term_set, user_lang_given)
+    gateway = get_gateway()
 
-    terms_list = "Contextual Terms:\n" + "\n".join(
-        f"Term: {term.term} : {term.definition}" for term in contextual_terms
+    def persist(parsed):
+        new_sentence = save_generated_sentence(
+            deck_id, user_lang_given, parsed, term_ids
+        )
+        bump_deck_version(deck_id)
+        db.session.commit()
+        return sse_event("sentence", {"id": new_sentence.id, **parsed})
+
+    def events():
+        try:
+            with gateway.stream(
+                "generate_sentences",
+                model=MODEL,
+                max_tokens=1500,
+                messages=[{"role": "user", "content": first_prompt}],
+            ) as stream:
+                for text in stream.text_stream:
+                    for parsed in parser.feed(text):
+                        yield persist(parsed)
+                usage = log_usage(deck_id, stream.get_final_message().usage)
+
+            for parsed in parser.close():
+                yield persist(parsed)
+            log_rejected(parser.rejected)
+
+            yield sse_event(
+                "done",
+                {
+                    "deck_id": deck_id,
+                    "deck_name": deck.deck_name,
+                    "count": len(parser.sentences),
+                    "rejected_count": len(parser.rejected),
+                    "usage": usage,
+                    "user_lang_given": user_lang_given,
+                },
+            )
+        except Exception as e:
+            db.session.rollback()
+            yield sse_event("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def build_generation_prompt(deck, all_terms, sentence_count):
+    # Everything up to the Key Terms is identical between calls for the same
+    # deck and vocabulary, so it is marked as a cacheable prompt prefix.
+    # Terms are listed in a canonical order and the per-call choices go last.
+    context_terms = select_context_terms(
+        all_terms, current_app.config.get("GENERATION_TERM_TOKEN_BUDGET")
     )
-    emphasized_terms_list = "\nKey Terms to Emphasize:\n" + "\n".join(
-        f"Term: {term.term} : {term.definition}" for term in emphasized_terms
+    emphasized_terms = select_key_terms(deck, sentence_count)
+
+    terms_list = "Deck Terms:\n" + "\n".join(map(term_line, context_terms))
+    emphasized_terms_list = "Key Terms to Emphasize:\n" + "\n".join(
+        map(term_line, emphasized_terms)
+    )
+    current_app.logger.debug(
+        "Generation prompt lists %d of %d deck terms, key terms:\n%s",
+        len(context_terms),
+        len(all_terms),
+        emphasized_terms_list,
     )
-    print("\Key Terms")
-    print(emphasized_terms_list)
 
     all_term_set = {term.term.lower() for term in all_terms}
 
-    first_prompt = f"""You are an expert language tutor creating practice sentences for a student learning {deck.deck_language}. Their native language is {deck.user_language}.
+    instructions = f"""You are an expert language tutor creating practice sentences for a student learning {deck.deck_language}. Their native language is {deck.user_language}.
     Here is a list of terms and their definitions that the student is learning:
 
     {terms_list}
-    {emphasized_terms_list}
 
-    Your task is to create {sentence_count} example {deck.deck_language} sentences and their {deck.user_language} translations, each focusing on one of the Key Terms. Follow these guidelines:
+    Your task is to create example {deck.deck_language} sentences and their {deck.user_language} translations, each focusing on one of the Key Terms listed at the end of this prompt. Follow these guidelines:
 
     1. Create one sentence for each of the Key Terms in order. Each sentence should primarily demonstrate the usage of its assigned Key Term.
-    2. You can and are encouraged to use the Contextual Terms and other Key Terms to create more natural sentences and provide context.
+    2. You can and are encouraged to use the other Deck Terms and other Key Terms to create more natural sentences and provide context.
     3. IMPORTANT: Use the exact terms and definitions provided in the term list. Do not use synonyms or alternative phrasings.
     4. Refrain from using complex vocabulary or grammar that is not in the term list. You may use beginner vocabulary and occasionally more complicated sentence structures.
     5. Create sentences that are fully grammatically correct, suitable for everyday conversations and practical scenarios.
@@ -59,7 +206,7 @@ def generate_sentences(deck_id):
     Terms used: {{term1}} ::: {{definition1}} ||| {{term2}} ::: {{definition2}} ||| ...
     New terms: {{new_term1}} ::: {{new_definition1}} ||| {{new_term2}} ::: {{new_definition2}} ||| ...
 
-    "Terms used" should only include any terms from the Key & Contextual Terms list that were used in its corresponding sentence. You must start the list of "Terms used" for each sentence with its corresponding Key Term.
+    "Terms used" should only include any terms from the Deck Terms or Key Terms lists that were used in its corresponding sentence. You must start the list of "Terms used" for each sentence with its corresponding Key Term.
     New terms should consist of any non-beginner vocabulary AND all non-beginner grammatical phrases, conjugations, or particles that are used in the example sentence, but not included within the list of provided terms.
     Always list all new terms, regardless of whether they were included in past generated sentences.
     If there are no new terms, keep "New terms:" and nothing afterwards.
@@ -70,98 +217,299 @@ def generate_sentences(deck_id):
     3. Ensure the sentences are logical, free of spelling mistakes, and fully GRAMATICALLY CORRECT.
     4. Provide ONLY the examples in the specified format, with no additional commentary."""
 
-    try:
-        first_response = anthropic.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=1500,
-            messages=[{"role": "user", "content": first_prompt}],
+    key_terms = f"""Create {sentence_count} examples, one for each of these Key Terms in order.
+
+    {emphasized_terms_list}"""
+
+    first_prompt = [
+        {
+            "type": "text",
+            "text": instructions,
+            "cache_control": {"type": "ephemeral"},
+        },
+        {"type": "text", "text": key_terms},
+    ]
+
+    return first_prompt, all_term_set
+
+
+def log_usage(deck_id, usage):
+    summary = usage_summary(usage)
+    current_app.logger.info(
+        "Generation for deck %s: %s input, %s cache write, %s cache read, %s output tokens",
+        deck_id,
+        summary["input_tokens"],
+        summary["cache_creation_input_tokens"],
+        summary["cache_read_input_tokens"],
+        summary["output_tokens"],
+    )
+    return summary
+
+
+def term_id_map(terms):
+    # Lowercased term -> term_id. A term listed twice links to its oldest
+    # row, as in migration 004's backfill (MIN(term_id)): later rows win
+    # the dict, so go newest first
+    return {
+        term.term.lower(): term.term_id
+        for term in sorted(terms, key=lambda term: term.term_id, reverse=True)
+    }
+
+
+def sentence_term_links(deck_id, terms_used, new_terms, term_ids):
+    return [
+        SentenceTerm(
+            deck_id=deck_id,
+            term_id=term_ids.get(term.lower()),
+            term=term,
+            definition=definition,
+            is_new=False,
         )
+        for term, definition in terms_used.items()
+    ] + [
+        SentenceTerm(deck_id=deck_id, term=term, definition=definition, is_new=True)
+        for term, definition in new_terms.items()
+    ]
+
+
+def save_generated_sentence(deck_id, user_lang_given, parsed, term_ids, pooled=False):
+    new_sentence = GeneratedSentence(
+        deck_id=deck_id,
+        user_lang_given=user_lang_given,
+        sentence=parsed["sentence"],
+        machine_translation=parsed["translation"],
+        terms_used=parsed["terms_used"],
+        new_terms=parsed["new_terms"],
+        pooled=pooled,
+    )
+    # Pooled sentences are linked to their terms when they are served
+    if not pooled:
+        new_sentence.term_links = sentence_term_links(
+            deck_id, parsed["terms_used"], parsed["new_terms"], term_ids
+        )
+    db.session.add(new_sentence)
+    return new_sentence
 
-        generated_text = first_response.content[0].text
-        print("\n\nGenerated Text:")
-        print(generated_text)
-
-        selected_sentences = []
-        for entry in generated_text.strip().split("\n\n"):
-            if all(
-                key in entry for key in ["Sentence:", "Translation:", "Terms used:"]
-            ):
-                sentence_parts = entry.split("\n")
-                sentence = sentence_parts[0].split("Sentence:")[1].strip()
-                translation = sentence_parts[1].split("Translation:")[1].strip()
-                if user_lang_given:
-                    sentence, translation = translation, sentence
-
-                terms_used = {}
-                new_terms = {}
-                for term_pair in sentence_parts[2].split("Terms used:")[1].split("|||"):
-                    if ":::" in term_pair:
-                        term, definition = term_pair.split(":::")
-                        term = term.strip()
-                        definition = definition.strip()
-                        if term.lower() in all_term_set:
-                            terms_used[term] = definition
-                        else:
-                            new_terms[term] = definition
-
-                if len(sentence_parts) > 3 and "New terms:" in sentence_parts[3]:
-                    for term_pair in (
-                        sentence_parts[3].split("New terms:")[1].split("|||")
-                    ):
-                        if ":::" in term_pair:
-                            term, definition = term_pair.split(":::")
-                            term = term.strip()
-                            definition = definition.strip()
-                            if term.lower() not in all_term_set:
-                                new_terms[term] = definition
-
-                selected_sentences.append(
-                    {
-                        "sentence": sentence,
-                        "translation": translation,
-                        "terms_used": terms_used,
-                        "new_terms": new_terms,
-                    }
-                )
 
-        for sentence in selected_sentences:
-            new_sentence = GeneratedSentence(
-                deck_id=deck_id,
-                user_lang_given=user_lang_given,
-                sentence=sentence["sentence"],
-                machine_translation=sentence["translation"],
-                terms_used=sentence["terms_used"],
-                new_terms=sentence["new_terms"],
-            )
-            db.session.add(new_sentence)
+def request_generated_sentences(deck, all_terms, user_lang_given, sentence_count):
+    first_prompt, all_term_set = build_generation_prompt(
+        deck, all_terms, sentence_count
+    )
+
+    first_response = get_gateway().create(
+        "generate_sentences",
+        model=MODEL,
+        max_tokens=1500,
+        messages=[{"role": "user", "content": first_prompt}],
+    )
+    usage = log_usage(deck.deck_id, first_response.usage)
+
+    generated_text = first_response.content[0].text
+    current_app.logger.debug("Generated text:\n%s", generated_text)
+
+    selected_sentences, rejected = parse_sentences(
+        generated_text, all_term_set, user_lang_given
+    )
+    log_rejected(rejected)
+
+    return selected_sentences, rejected, usage
+
+
+def log_rejected(rejected):
+    for block in rejected:
+        current_app.logger.debug(
+            "Rejected block (%s): %r", block["reason"], block["block"]
+        )
+
+
+def generate_deck_sentences(deck_id, user_lang_given, sentence_count):
+    deck = cached_deck(deck_id)
+    all_terms = cached_terms(deck_id)
+    term_ids = term_id_map(all_terms)
+
+    if not term_ids:
+        raise ValueError("No terms found in this deck")
+
+    # Serve what the pool has and only ask the LLM for the remainder
+    selected_sentences = [
+        {
+            "sentence": sentence.sentence,
+            "translation": sentence.machine_translation,
+            "terms_used": sentence.terms_used,
+            "new_terms": sentence.new_terms,
+        }
+        for sentence in claim_pooled_sentences(
+            deck_id, user_lang_given, sentence_count, term_ids
+        )
+    ]
+    pooled_count = len(selected_sentences)
+    rejected = []
+    usage = None
+
+    if pooled_count < sentence_count:
+        generated_sentences, rejected, usage = request_generated_sentences(
+            deck, all_terms, user_lang_given, sentence_count - pooled_count
+        )
+        for sentence in generated_sentences:
+            save_generated_sentence(deck_id, user_lang_given, sentence, term_ids)
+        bump_deck_version(deck_id)
         db.session.commit()
+        selected_sentences += generated_sentences
+
+    schedule_pool_refill(deck_id, user_lang_given)
+
+    return {
+        "deck_id": deck_id,
+        "deck_name": deck.deck_name,
+        "generated_sentences": selected_sentences,
+        "pooled_count": pooled_count,
+        "rejected_count": len(rejected),
+        "usage": usage,
+        "user_lang_given": user_lang_given,
+    }
+
+
+def claim_pooled_sentences(deck_id, user_lang_given, count, term_ids):
+    if count <= 0:
+        return []
+
+    # One UPDATE ... RETURNING, so concurrent requests never claim the same row
+    pooled_ids = (
+        select(GeneratedSentence.id)
+        .where(
+            GeneratedSentence.deck_id == deck_id,
+            GeneratedSentence.pooled.is_(True),
+            GeneratedSentence.user_lang_given == user_lang_given,
+        )
+        .order_by(GeneratedSentence.id)
+        .limit(count)
+    )
+    claimed_ids = (
+        db.session.execute(
+            update(GeneratedSentence)
+            .where(GeneratedSentence.id.in_(pooled_ids))
+            .values(pooled=False, created_at=datetime.now())
+            .returning(GeneratedSentence.id),
+            execution_options={"synchronize_session": False},
+        )
+        .scalars()
+        .all()
+    )
+    if not claimed_ids:
+        db.session.rollback()
+        return []
 
-        return jsonify(
-            {
-                "deck_id": deck_id,
-                "deck_name": deck.deck_name,
-                "generated_sentences": selected_sentences,
-                "user_lang_given": user_lang_given,
-            }
+    sentences = (
+        GeneratedSentence.query.filter(GeneratedSentence.id.in_(claimed_ids))
+        .order_by(GeneratedSentence.id)
+        .populate_existing()
+        .all()
+    )
+    for sentence in sentences:
+        sentence.term_links = sentence_term_links(
+            deck_id, sentence.terms_used, sentence.new_terms, term_ids
         )
+    bump_deck_version(deck_id)
+    db.session.commit()
+    return sentences
 
-    except Exception as e:
+
+def schedule_pool_refill(deck_id, user_lang_given):
+    if not current_app.config.get("SENTENCE_POOL_SIZE"):
+        return
+
+    key = (deck_id, user_lang_given)
+    with _pool_lock:
+        if key in _pool_refills:
+            return
+        _pool_refills.add(key)
+
+    app = current_app._get_current_object()
+    get_executor(app).submit(run_pool_refill, app, deck_id, user_lang_given)
+
+
+def run_pool_refill(app, deck_id, user_lang_given):
+    try:
+        with app.app_context():
+            refill_sentence_pool(deck_id, user_lang_given)
+    except Exception:
+        app.logger.exception("Refilling the sentence pool for deck %s failed", deck_id)
+    finally:
+        with _pool_lock:
+            _pool_refills.discard((deck_id, user_lang_given))
+
+
+def refill_sentence_pool(deck_id, user_lang_given):
+    watermark = current_app.config.get("SENTENCE_POOL_SIZE", 0)
+    batch_size = current_app.config.get("SENTENCE_POOL_BATCH_SIZE", 10)
+
+    while True:
+        with _pool_lock:
+            version = _pool_versions.get(deck_id, 0)
+
+        deck = cached_deck(deck_id)
+        all_terms = cached_terms(deck_id)
+        if deck is None or not all_terms:
+            return
+
+        pooled_count = GeneratedSentence.query.filter_by(
+            deck_id=deck_id, pooled=True, user_lang_given=user_lang_given
+        ).count()
         db.session.rollback()
-        return jsonify({"error": str(e)}), 500
+        if pooled_count >= watermark:
+            return
 
+        generated_sentences, _, _ = request_generated_sentences(
+            deck, all_terms, user_lang_given, min(watermark - pooled_count, batch_size)
+        )
+        if not generated_sentences:
+            return
 
-@prompts_bp.route("/sentences/<int:sentence_id>/translate", methods=["POST"])
-def translate_sentence(sentence_id):
-    sentence = GeneratedSentence.query.get_or_404(sentence_id)
-    deck = Deck.query.get_or_404(sentence.deck_id)
-    data = request.json
+        # The terms changed while the LLM was working; generate again
+        with _pool_lock:
+            if _pool_versions.get(deck_id, 0) != version:
+                continue
+
+        for sentence in generated_sentences:
+            save_generated_sentence(deck_id, user_lang_given, sentence, {}, pooled=True)
+        db.session.commit()
 
-    if "translation" not in data:
-        return jsonify({"error": "Translation is required"}), 400
 
+def refresh_sentence_pool(deck_id, discard=False):
+    # Called after a deck's terms or sentences change. The caller has committed.
+    directions = [
+        user_lang_given
+        for (user_lang_given,) in db.session.query(GeneratedSentence.user_lang_given)
+        .filter_by(deck_id=deck_id, pooled=True)
+        .distinct()
+    ]
+
+    if discard:
+        # Pooled sentences were written against the old terms
+        with _pool_lock:
+            _pool_versions[deck_id] = _pool_versions.get(deck_id, 0) + 1
+        GeneratedSentence.query.filter_by(deck_id=deck_id, pooled=True).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    for user_lang_given in directions:
+        schedule_pool_refill(deck_id, user_lang_given)
+
+
+def evaluation_cache_key_for(sentence, user_translation):
+    return evaluation_cache_key(
+        MODEL,
+        sentence.sentence,
+        sentence.machine_translation,
+        user_translation,
+        sentence.terms_used,
+    )
+
+
+def build_evaluation_prompt(sentence, deck, user_translation):
     original_sentence = sentence.sentence
     machine_translation = sentence.machine_translation
-    user_translation = data["translation"]
     terms_used = sentence.terms_used
 
     original_lang = (
@@ -220,23 +568,53 @@ def translate_sentence(sentence_id):
         4. Provide ONLY the Rating and Review in the specified format. Do not include any other text or explanations.
         """
 
-    try:
-        message = anthropic.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=300,
-            messages=[{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        )
+    return prompt
+
+
+def request_evaluation(gateway, prompt):
+    message = gateway.create(
+        "translate_sentence",
+        model=MODEL,
+        max_tokens=300,
+        messages=[{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+    )
+
+    evaluation = message.content[0].text
+
+    rating_match = re.search(r"Rating: (\d+)", evaluation)
+    text_match = re.search(r"Review: ([\s\S]+?)(?=\nRating:|\Z)", evaluation)
+
+    if rating_match and text_match:
+        evaluation_rating = int(rating_match.group(1))
+        evaluation_text = text_match.group(1).strip()
+    else:
+        raise ValueError("Failed to parse evaluation response")
+
+    return evaluation_rating, evaluation_text
 
-        evaluation = message.content[0].text
 
-        rating_match = re.search(r"Rating: (\d+)", evaluation)
-        text_match = re.search(r"Review: ([\s\S]+?)(?=\nRating:|\Z)", evaluation)
+@prompts_bp.route("/sentences/<int:sentence_id>/translate", methods=["POST"])
+def translate_sentence(sentence_id):
+    sentence = GeneratedSentence.query.get_or_404(sentence_id)
+    deck = cached_deck_or_404(sentence.deck_id)
+    data = request.json
+
+    if "translation" not in data:
+        return jsonify({"error": "Translation is required"}), 400
+
+    user_translation = data["translation"]
+    cache_key = evaluation_cache_key_for(sentence, user_translation)
 
-        if rating_match and text_match:
-            evaluation_rating = int(rating_match.group(1))
-            evaluation_text = text_match.group(1).strip()
+    try:
+        cached = get_cached_evaluation(cache_key)
+        if cached is not None:
+            evaluation_rating, evaluation_text = cached
         else:
-            raise ValueError("Failed to parse evaluation response")
+            evaluation_rating, evaluation_text = request_evaluation(
+                get_gateway(),
+                build_evaluation_prompt(sentence, deck, user_translation),
+            )
+            store_evaluation(cache_key, evaluation_rating, evaluation_text)
 
         sentence.user_translation = user_translation
         sentence.evaluation_rating = evaluation_rating
@@ -244,20 +622,152 @@ def translate_sentence(sentence_id):
 
         # TODO: We may choose to make the LLM evaluate its own translation here as well.
 
+        bump_deck_version(sentence.deck_id)
         db.session.commit()
 
-        return jsonify(
-            {
-                "id": sentence.id,
-                "sentence": sentence.sentence,
-                "machine_translation": sentence.machine_translation,
-                "user_translation": sentence.user_translation,
-                "evaluation_rating": sentence.evaluation_rating,
-                "evaluation_text": sentence.evaluation_text,
-                "created_at": sentence.created_at.isoformat(),
+        return jsonify(serialize(sentence, EVALUATED_SENTENCE_FIELDS))
+
+    except LLMUnavailableError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@prompts_bp.route("/sentences/batch-translate", methods=["POST"])
+def batch_translate_sentences():
+    data = request.json or {}
+    items = data.get("translations")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "A list of translations is required"}), 400
+
+    max_batch_size = current_app.config.get("MAX_EVALUATION_BATCH_SIZE", 50)
+    if len(items) > max_batch_size:
+        return (
+            jsonify({"error": f"At most {max_batch_size} translations per batch"}),
+            400,
+        )
+
+    def sentence_id_of(item):
+        # bool is an int too, and anything unhashable would break the lookups
+        sentence_id = item.get("sentence_id") if isinstance(item, dict) else None
+        if isinstance(sentence_id, int) and not isinstance(sentence_id, bool):
+            return sentence_id
+        return None
+
+    sentence_ids = {sentence_id_of(item) for item in items} - {None}
+    sentences = {
+        sentence.id: sentence
+        for sentence in GeneratedSentence.query.filter(
+            GeneratedSentence.id.in_(sentence_ids)
+        )
+    }
+    decks = {
+        deck.deck_id: deck
+        for deck in Deck.query.filter(
+            Deck.deck_id.in_({sentence.deck_id for sentence in sentences.values()})
+        )
+    }
+    # A soft-deleted deck's sentences stay until the purge reaches them, but
+    # the deck itself is already hidden
+    sentences = {
+        sentence_id: sentence
+        for sentence_id, sentence in sentences.items()
+        if sentence.deck_id in decks
+    }
+
+    results = [None] * len(items)
+    cache_keys = [None] * len(items)
+    evaluations = {}
+    prompts = {}
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or "translation" not in item:
+            results[index] = {"error": "Translation is required"}
+            continue
+        if sentence_id_of(item) is None:
+            results[index] = {"error": "sentence_id must be an integer"}
+            continue
+        sentence = sentences.get(item["sentence_id"])
+        if sentence is None:
+            results[index] = {
+                "sentence_id": item["sentence_id"],
+                "error": "Sentence not found",
             }
+            continue
+
+        cache_key = evaluation_cache_key_for(sentence, item["translation"])
+        if cache_key not in evaluations and cache_key not in prompts:
+            cached = get_cached_evaluation(cache_key)
+            if cached is not None:
+                evaluations[cache_key] = cached
+            else:
+                prompts[cache_key] = build_evaluation_prompt(
+                    sentence, decks[sentence.deck_id], item["translation"]
+                )
+        cache_keys[index] = cache_key
+
+    # Grade the cache misses concurrently; the gateway is thread-safe and the
+    # prompts were built up front, so workers never touch the session
+    failures = {}
+    if prompts:
+        gateway = get_gateway()
+        concurrency = current_app.config.get("EVALUATION_BATCH_CONCURRENCY", 5)
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(concurrency, len(prompts))),
+            thread_name_prefix="evaluations",
+        ) as executor:
+            futures = {
+                executor.submit(request_evaluation, gateway, prompt): cache_key
+                for cache_key, prompt in prompts.items()
+            }
+            for future in as_completed(futures):
+                cache_key = futures[future]
+                try:
+                    evaluations[cache_key] = future.result()
+                except Exception as e:
+                    failures[cache_key] = str(e)
+
+    try:
+        for cache_key in prompts:
+            if cache_key in evaluations:
+                store_evaluation(cache_key, *evaluations[cache_key])
+
+        for index, (item, cache_key) in enumerate(zip(items, cache_keys)):
+            if cache_key is None:
+                continue
+            if cache_key in failures:
+                results[index] = {
+                    "sentence_id": item["sentence_id"],
+                    "error": failures[cache_key],
+                }
+                continue
+
+            sentence = sentences[item["sentence_id"]]
+            sentence.user_translation = item["translation"]
+            sentence.evaluation_rating, sentence.evaluation_text = evaluations[
+                cache_key
+            ]
+            results[index] = serialize(sentence, EVALUATED_SENTENCE_FIELDS)
+
+        bump_deck_version(
+            *(
+                sentences[item["sentence_id"]].deck_id
+                for item, result in zip(items, results)
+                if "error" not in result
+            )
         )
+        db.session.commit()
 
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
+
+    return jsonify(
+        {
+            "results": results,
+            "evaluated": sum("error" not in result for result in results),
+            "failed": sum("error" in result for result in results),
+        }
+    )
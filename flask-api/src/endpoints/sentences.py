@@ -1,60 +1,232 @@
 from flask import Blueprint, jsonify, request
 from src import db
-from src.models import Deck, GeneratedSentence, ArchivedSentence
+from src.endpoints.prompts import refresh_sentence_pool
+from src.etags import (
+    bump_deck_version,
+    deck_etag,
+    etag_matches,
+    list_variant,
+    not_modified,
+    with_etag,
+)
+from src.models import Deck, GeneratedSentence, ArchivedSentence, SentenceTerm, Term
+from src.queries import keyset_page, page_args
+from src.serializers import SENTENCE_FIELDS, columns, list_format, serialize_many
+from src.storage import read_only
+from sqlalchemy import func, insert, select
+from datetime import datetime
 
 sentences_bp = Blueprint("sentences", __name__)
 
 
 @sentences_bp.route("/decks/<int:deck_id>/sentences", methods=["GET"])
+@read_only
 def get_sentences(deck_id):
+    limit, cursor = page_args()
+    try:
+        columnar = list_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = deck_etag(
+        "sentences", deck_id, variant=list_variant(limit, cursor, columnar)
+    )
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    # Column rows, with the JSON blobs passed through undecoded
+    sentences, next_cursor = keyset_page(
+        db.session.query(*columns(GeneratedSentence, SENTENCE_FIELDS)).filter(
+            GeneratedSentence.deck_id == deck_id, GeneratedSentence.pooled.is_(False)
+        ),
+        GeneratedSentence.id,
+        lambda sentence: sentence.id,
+        limit,
+        cursor,
+    )
+
+    response = jsonify(
+        {
+            "sentences": serialize_many(sentences, SENTENCE_FIELDS, columnar=columnar),
+            "next_cursor": next_cursor,
+        }
+    )
+    return with_etag(response, etag)
+
+
+@sentences_bp.route("/decks/<int:deck_id>/archive-sentences", methods=["POST"])
+def archive_sentences(deck_id):
     deck = Deck.query.get_or_404(deck_id)
-    sentences = GeneratedSentence.query.filter_by(deck_id=deck_id).all()
+
+    criteria = [
+        GeneratedSentence.deck_id == deck_id,
+        GeneratedSentence.pooled.is_(False),
+    ]
+    if request.args.get("evaluated_only", "false").lower() == "true":
+        criteria.append(GeneratedSentence.evaluation_rating.isnot(None))
+    if request.args.get("older_than"):
+        try:
+            older_than = datetime.fromisoformat(request.args["older_than"])
+        except ValueError:
+            return jsonify({"error": "older_than must be an ISO 8601 datetime"}), 400
+        criteria.append(GeneratedSentence.created_at < older_than)
+
+    # Copy and delete in SQL so rows and their JSON blobs never pass
+    # through Python; all statements share one transaction
+    columns = [
+        "deck_id",
+        "user_lang_given",
+        "sentence",
+        "machine_translation",
+        "terms_used_json",
+        "new_terms_json",
+        "user_translation",
+        "evaluation_rating",
+        "evaluation_text",
+    ]
+    try:
+        db.session.execute(
+            insert(ArchivedSentence).from_select(
+                columns + ["generated_sentence_id"],
+                select(
+                    *(getattr(GeneratedSentence, column) for column in columns),
+                    GeneratedSentence.id,
+                )
+                .where(*criteria)
+                .order_by(GeneratedSentence.id),
+            )
+        )
+
+        # Point the term links at the archived copies (the newest copy, in
+        # case a database without AUTOINCREMENT has reused generated ids)
+        archived_id = (
+            select(func.max(ArchivedSentence.id))
+            .where(
+                ArchivedSentence.generated_sentence_id
+                == SentenceTerm.generated_sentence_id
+            )
+            .scalar_subquery()
+        )
+        SentenceTerm.query.filter(
+            SentenceTerm.generated_sentence_id.in_(
+                select(GeneratedSentence.id).where(*criteria)
+            )
+        ).update(
+            {
+                SentenceTerm.archived_sentence_id: archived_id,
+                SentenceTerm.generated_sentence_id: None,
+            },
+            synchronize_session=False,
+        )
+
+        archived = GeneratedSentence.query.filter(*criteria).delete(
+            synchronize_session=False
+        )
+        if archived:
+            bump_deck_version(deck_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    refresh_sentence_pool(deck_id)
+
+    return (
+        jsonify(
+            {
+                "message": f"Archived {archived} sentences for deck {deck_id}",
+                "archived": archived,
+            }
+        ),
+        200,
+    )
+
+
+@sentences_bp.route("/terms/<int:term_id>/sentences", methods=["GET"])
+@read_only
+def get_sentences_by_term(term_id):
+    term = Term.query.get_or_404(term_id)
+    include_archived = request.args.get("include_archived", "true").lower() == "true"
+
+    links = (
+        db.session.query(SentenceTerm, GeneratedSentence, ArchivedSentence)
+        .outerjoin(
+            GeneratedSentence,
+            GeneratedSentence.id == SentenceTerm.generated_sentence_id,
+        )
+        .outerjoin(
+            ArchivedSentence, ArchivedSentence.id == SentenceTerm.archived_sentence_id
+        )
+        .filter(SentenceTerm.term_id == term_id)
+    )
+    if not include_archived:
+        links = links.filter(SentenceTerm.generated_sentence_id.isnot(None))
+
+    limit, cursor = page_args()
+    links, next_cursor = keyset_page(
+        links, SentenceTerm.id, lambda row: row[0].id, limit, cursor
+    )
 
     return jsonify(
         {
+            "term_id": term.term_id,
+            "term": term.term,
+            "definition": term.definition,
             "sentences": [
                 {
                     "id": sentence.id,
                     "deck_id": sentence.deck_id,
-                    "user_lang_given": sentence.user_lang_given,
+                    "archived": archived_sentence is not None,
                     "sentence": sentence.sentence,
                     "machine_translation": sentence.machine_translation,
                     "user_translation": sentence.user_translation,
-                    "terms_used": sentence.terms_used,
-                    "new_terms": sentence.new_terms,
                     "evaluation_rating": sentence.evaluation_rating,
-                    "evaluation_text": sentence.evaluation_text,
-                    "created_at": sentence.created_at.isoformat(),
                 }
-                for sentence in sentences
-            ]
+                for _, generated_sentence, archived_sentence in links
+                for sentence in [generated_sentence or archived_sentence]
+            ],
+            "next_cursor": next_cursor,
         }
     )
 
 
-@sentences_bp.route("/decks/<int:deck_id>/archive-sentences", methods=["POST"])
-def archive_sentences(deck_id):
+@sentences_bp.route("/decks/<int:deck_id>/term-usage", methods=["GET"])
+@read_only
+def get_term_usage(deck_id):
+    etag = deck_etag("term-usage", deck_id)
+    if etag_matches(etag):
+        return not_modified(etag)
+
     deck = Deck.query.get_or_404(deck_id)
-    sentences = GeneratedSentence.query.filter_by(deck_id=deck_id).all()
-
-    for sentence in sentences:
-        archived_sentence = ArchivedSentence(
-            deck_id=sentence.deck_id,
-            user_lang_given=sentence.user_lang_given,
-            sentence=sentence.sentence,
-            machine_translation=sentence.machine_translation,
-            terms_used=sentence.terms_used,
-            new_terms=sentence.new_terms,
-            user_translation=sentence.user_translation,
-            evaluation_rating=sentence.evaluation_rating,
-            evaluation_text=sentence.evaluation_text,
-        )
-        db.session.add(archived_sentence)
-        db.session.delete(sentence)
 
-    db.session.commit()
+    usage = (
+        db.session.query(
+            Term,
+            func.count(SentenceTerm.generated_sentence_id),
+            func.count(SentenceTerm.archived_sentence_id),
+        )
+        .outerjoin(SentenceTerm, SentenceTerm.term_id == Term.term_id)
+        .filter(Term.deck_id == deck_id)
+        .group_by(Term.term_id)
+        .order_by(Term.term_id)
+        .all()
+    )
 
-    return (
-        jsonify({"message": f"Archived {len(sentences)} sentences for deck {deck_id}"}),
-        200,
+    response = jsonify(
+        {
+            "deck_id": deck.deck_id,
+            "deck_name": deck.deck_name,
+            "terms": [
+                {
+                    "term_id": term.term_id,
+                    "term": term.term,
+                    "definition": term.definition,
+                    "sentence_count": active_count + archived_count,
+                    "active_count": active_count,
+                    "archived_count": archived_count,
+                }
+                for term, active_count, archived_count in usage
+            ],
+        }
     )
+    return with_etag(response, etag)
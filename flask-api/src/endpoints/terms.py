@@ -1,29 +1,282 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src import db
-from src.models import Term, Deck, User
+from src.deck_cache import cached_deck_or_404, cached_terms, invalidate_terms
+from src.endpoints.prompts import refresh_sentence_pool
+from src.etags import (
+    bump_deck_version,
+    deck_etag,
+    etag_matches,
+    list_variant,
+    not_modified,
+    with_etag,
+)
+from src.models import SentenceTerm, Term, Deck, User
+from src.queries import keyset_page, keyset_slice, page_args
+from src.serializers import (
+    TERM_FIELDS,
+    TERM_LIST_FIELDS,
+    columns,
+    list_format,
+    serialize,
+    serialize_many,
+)
+from src.storage import read_only
+from sqlalchemy import bindparam, delete, insert, update
 from collections import defaultdict
-import csv, io
+import csv
 
 terms_bp = Blueprint("terms", __name__)
 
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_REJECTIONS = 50
+
+
+def import_error(error):
+    # (message, status) for an import that stopped on `error`
+    if isinstance(error, UnicodeDecodeError):
+        return "File must be UTF-8 encoded", 400
+    return str(error), 500
+
+
+def decode_lines(binary_stream):
+    # Line by line rather than through a TextIOWrapper, which decodes ahead
+    # in chunks, so a decode error is raised at the line it is in
+    for index, line in enumerate(binary_stream):
+        yield line.decode("utf-8-sig" if index == 0 else "utf-8")
+
+
+def import_terms(deck_id, binary_stream):
+    # Decode and parse the upload row by row, inserting and committing in
+    # batches so neither memory nor the write lock scale with file size.
+    # An error before the first commit is raised; after it, the committed
+    # batches stay and the report says where the import stopped
+    report = {
+        "rows_accepted": 0,
+        "rows_rejected": 0,
+        "rows_duplicate": 0,
+        "batches_committed": 0,
+        "rejected": [],
+    }
+    seen_terms = {
+        term.lower()
+        for (term,) in db.session.query(Term.term).filter(Term.deck_id == deck_id)
+    }
+
+    def flush(batch):
+        db.session.execute(insert(Term), batch)
+        bump_deck_version(deck_id)
+        db.session.commit()
+        invalidate_terms(deck_id)
+        report["rows_accepted"] += len(batch)
+        report["batches_committed"] += 1
+
+    csv_reader = csv.reader(decode_lines(binary_stream))
+    try:
+        # Skip the header row if it exists
+        next(csv_reader, None)
+
+        batch = []
+        for row in csv_reader:
+            # Ensure the row has both a term and a definition
+            term = row[0].strip() if row else ""
+            definition = row[1].strip() if len(row) >= 2 else ""
+            if not term or not definition:
+                report["rows_rejected"] += 1
+                if len(report["rejected"]) < MAX_REPORTED_REJECTIONS:
+                    report["rejected"].append(
+                        {
+                            "line": csv_reader.line_num,
+                            "reason": "missing term or definition",
+                        }
+                    )
+                continue
+
+            if term.lower() in seen_terms:
+                report["rows_duplicate"] += 1
+                continue
+            seen_terms.add(term.lower())
+
+            batch.append({"deck_id": deck_id, "term": term, "definition": definition})
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush(batch)
+                batch = []
+
+        if batch:
+            flush(batch)
+    except Exception as e:
+        if not report["batches_committed"]:
+            raise
+        db.session.rollback()
+        message, status = import_error(e)
+        report["failed"] = {
+            # A decode error is in the line after the last one read; a failed
+            # flush covers the batch that ends at the last line read
+            "line": csv_reader.line_num
+            + (1 if isinstance(e, UnicodeDecodeError) else 0),
+            "error": message,
+            "status": status,
+        }
+
+    return report
+
+
+def validate_bulk_terms(deck_id, data):
+    """Check a whole bulk request up front; returns (creates, updates, deletes, errors).
+
+    Nothing is written unless `errors` is empty, so a batch is applied
+    either completely or not at all.
+    """
+    errors = []
+
+    def fail(op, index, message):
+        errors.append({"op": op, "index": index, "error": message})
+
+    def is_text(value):
+        return isinstance(value, str) and value.strip() != ""
+
+    def is_id(value):
+        return isinstance(value, int) and not isinstance(value, bool)
+
+    if not isinstance(data, dict):
+        return [], [], [], [{"error": "Request body must be a JSON object"}]
+    items = {op: data.get(op, []) for op in ("create", "update", "delete")}
+    for op, value in items.items():
+        if not isinstance(value, list):
+            fail(op, None, f"{op} must be a list")
+            items[op] = []
+    creates, updates, deletes = items["create"], items["update"], items["delete"]
+
+    max_items = current_app.config.get("MAX_BULK_TERMS", 5000)
+    if len(creates) + len(updates) + len(deletes) > max_items:
+        fail(None, None, f"At most {max_items} items per request")
+        return creates, updates, deletes, errors
+
+    for index, item in enumerate(creates):
+        if not isinstance(item, dict):
+            fail("create", index, "Item must be an object")
+        elif not (is_text(item.get("term")) and is_text(item.get("definition"))):
+            fail("create", index, "term and definition are required")
+
+    referenced = {}
+    for index, item in enumerate(updates):
+        if not isinstance(item, dict) or not is_id(item.get("term_id")):
+            fail("update", index, "Item must be an object with a term_id")
+            continue
+        fields = [field for field in ("term", "definition") if field in item]
+        if not fields:
+            fail("update", index, "Nothing to update")
+        elif not all(is_text(item[field]) for field in fields):
+            fail("update", index, "term and definition must not be empty")
+        referenced.setdefault(item["term_id"], []).append(("update", index))
+    for index, term_id in enumerate(deletes):
+        if not is_id(term_id):
+            fail("delete", index, "Item must be a term_id")
+            continue
+        referenced.setdefault(term_id, []).append(("delete", index))
+
+    in_deck = {
+        term_id
+        for (term_id,) in db.session.query(Term.term_id).filter(
+            Term.deck_id == deck_id, Term.term_id.in_(referenced)
+        )
+    }
+    for term_id, uses in referenced.items():
+        if term_id not in in_deck:
+            for op, index in uses:
+                fail(op, index, f"Term {term_id} not found in deck {deck_id}")
+        elif len(uses) > 1:
+            for op, index in uses[1:]:
+                fail(op, index, f"Term {term_id} appears more than once")
+
+    return creates, updates, deletes, errors
+
+
+def apply_bulk_terms(deck_id, creates, updates, deletes):
+    # One executemany per statement shape, all in the caller's transaction
+    created = []
+    if creates:
+        created = db.session.execute(
+            insert(Term).returning(
+                *columns(Term, TERM_FIELDS), sort_by_parameter_order=True
+            ),
+            [
+                {
+                    "deck_id": deck_id,
+                    "term": item["term"],
+                    "definition": item["definition"],
+                }
+                for item in creates
+            ],
+        ).all()
+
+    # Partial updates are grouped by the columns they set
+    by_fields = defaultdict(list)
+    for item in updates:
+        fields = tuple(field for field in ("term", "definition") if field in item)
+        by_fields[fields].append(
+            {
+                "b_term_id": item["term_id"],
+                **{f"b_{field}": item[field] for field in fields},
+            }
+        )
+    connection = db.session.connection()
+    for fields, params in by_fields.items():
+        connection.execute(
+            update(Term)
+            .where(Term.term_id == bindparam("b_term_id"))
+            .values({field: bindparam(f"b_{field}") for field in fields}),
+            params,
+        )
+
+    if deletes:
+        # Keep the sentence links, but stop pointing them at the deleted terms
+        connection.execute(
+            update(SentenceTerm)
+            .where(SentenceTerm.term_id == bindparam("b_term_id"))
+            .values(term_id=None),
+            [{"b_term_id": term_id} for term_id in deletes],
+        )
+        connection.execute(
+            delete(Term).where(Term.term_id == bindparam("b_term_id")),
+            [{"b_term_id": term_id} for term_id in deletes],
+        )
+
+    updated = {}
+    if updates:
+        updated = {
+            row.term_id: row
+            for row in db.session.query(*columns(Term, TERM_FIELDS)).filter(
+                Term.term_id.in_([item["term_id"] for item in updates])
+            )
+        }
+
+    return {
+        "created": serialize_many(created, TERM_FIELDS),
+        "updated": serialize_many(
+            [updated[item["term_id"]] for item in updates], TERM_FIELDS
+        ),
+        "deleted": [{"term_id": term_id} for term_id in deletes],
+    }
+
 
 @terms_bp.route("/users/<int:user_id>/terms", methods=["GET"])
+@read_only
 def get_terms_by_user(user_id):
     user = User.query.get_or_404(user_id)
-    decks_with_terms = (
-        Deck.query.filter(Deck.user_id == user_id).join(Term).add_entity(Term).all()
+    limit, cursor = page_args()
+    decks_with_terms, next_cursor = keyset_page(
+        Deck.query.filter(Deck.user_id == user_id).join(Term).add_entity(Term),
+        Term.term_id,
+        lambda row: row[1].term_id,
+        limit,
+        cursor,
     )
 
+    deck_names = {}
     organized_terms = defaultdict(list)
     for deck, term in decks_with_terms:
-        organized_terms[deck.deck_id].append(
-            {
-                "term_id": term.term_id,
-                "term": term.term,
-                "definition": term.definition,
-                "created_at": term.created_at.isoformat(),
-            }
-        )
+        deck_names[deck.deck_id] = deck.deck_name
+        organized_terms[deck.deck_id].append(serialize(term, TERM_LIST_FIELDS))
 
     response = {
         "user_id": user_id,
@@ -31,20 +284,35 @@ def get_terms_by_user(user_id):
         "decks": [
             {
                 "deck_id": deck_id,
-                "deck_name": Deck.query.get(deck_id).deck_name,
+                "deck_name": deck_names[deck_id],
                 "terms": terms,
             }
             for deck_id, terms in organized_terms.items()
         ],
+        "next_cursor": next_cursor,
     }
 
     return jsonify(response)
 
 
 @terms_bp.route("/decks/<int:deck_id>/terms", methods=["GET"])
+@read_only
 def get_terms_by_deck(deck_id):
-    deck = Deck.query.get_or_404(deck_id)
-    terms = Term.query.filter_by(deck_id=deck_id).all()
+    limit, cursor = page_args()
+    try:
+        columnar = list_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = deck_etag("terms", deck_id, variant=list_variant(limit, cursor, columnar))
+    if etag_matches(etag):
+        return not_modified(etag)
+
+    deck = cached_deck_or_404(deck_id)
+
+    terms, next_cursor = keyset_slice(
+        cached_terms(deck_id), lambda term: term.term_id, limit, cursor
+    )
 
     response = {
         "deck_id": deck_id,
@@ -52,33 +320,19 @@ def get_terms_by_deck(deck_id):
         "user_id": deck.user_id,
         "user_language": deck.user_language,
         "deck_language": deck.deck_language,
-        "username": deck.user.username,
-        "terms": [
-            {
-                "term_id": term.term_id,
-                "term": term.term,
-                "definition": term.definition,
-                "created_at": term.created_at.isoformat(),
-            }
-            for term in terms
-        ],
+        "username": deck.username,
+        "terms": serialize_many(terms, TERM_LIST_FIELDS, columnar=columnar),
+        "next_cursor": next_cursor,
     }
 
-    return jsonify(response)
+    return with_etag(jsonify(response), etag)
 
 
 @terms_bp.route("/terms/<int:term_id>", methods=["GET"])
+@read_only
 def get_term(term_id):
     term = Term.query.get_or_404(term_id)
-    return jsonify(
-        {
-            "term_id": term.term_id,
-            "deck_id": term.deck_id,
-            "term": term.term,
-            "definition": term.definition,
-            "created_at": term.created_at,
-        }
-    )
+    return jsonify(serialize(term, TERM_FIELDS))
 
 
 @terms_bp.route("/decks/<int:deck_id>/terms", methods=["POST"])
@@ -86,19 +340,11 @@ def create_term(deck_id):
     data = request.json
     new_term = Term(deck_id=deck_id, term=data["term"], definition=data["definition"])
     db.session.add(new_term)
+    bump_deck_version(deck_id)
     db.session.commit()
-    return (
-        jsonify(
-            {
-                "term_id": new_term.term_id,
-                "deck_id": new_term.deck_id,
-                "term": new_term.term,
-                "definition": new_term.definition,
-                "created_at": new_term.created_at,
-            }
-        ),
-        201,
-    )
+    invalidate_terms(deck_id)
+    refresh_sentence_pool(deck_id, discard=True)
+    return jsonify(serialize(new_term, TERM_FIELDS)), 201
 
 
 @terms_bp.route("/terms/<int:term_id>", methods=["PUT"])
@@ -111,32 +357,58 @@ def update_term(term_id):
     if "definition" in data:
         term.definition = data["definition"]
 
+    bump_deck_version(term.deck_id)
     db.session.commit()
+    invalidate_terms(term.deck_id)
+    refresh_sentence_pool(term.deck_id, discard=True)
 
-    return (
-        jsonify(
-            {
-                "term_id": term.term_id,
-                "deck_id": term.deck_id,
-                "term": term.term,
-                "definition": term.definition,
-                "created_at": term.created_at.isoformat(),
-            }
-        ),
-        200,
-    )
+    return jsonify(serialize(term, TERM_FIELDS)), 200
 
 
 @terms_bp.route("/terms/<int:term_id>", methods=["DELETE"])
 def delete_term(term_id):
     term = Term.query.get_or_404(term_id)
 
+    # Keep the sentence links, but stop pointing them at the deleted term
+    SentenceTerm.query.filter_by(term_id=term_id).update(
+        {SentenceTerm.term_id: None}, synchronize_session=False
+    )
+    deck_id = term.deck_id
     db.session.delete(term)
+    bump_deck_version(deck_id)
     db.session.commit()
+    invalidate_terms(deck_id)
+    refresh_sentence_pool(deck_id, discard=True)
 
     return jsonify({"message": f"Term {term_id} has been deleted"}), 200
 
 
+@terms_bp.route("/decks/<int:deck_id>/terms/bulk", methods=["POST"])
+def bulk_update_terms(deck_id):
+    # {"create": [{term, definition}], "update": [{term_id, term?, definition?}],
+    #  "delete": [term_id]}, applied together in one transaction
+    Deck.query.get_or_404(deck_id)
+
+    creates, updates, deletes, errors = validate_bulk_terms(deck_id, request.json)
+    if errors:
+        return jsonify({"error": "Invalid bulk request", "errors": errors}), 400
+    if not (creates or updates or deletes):
+        return jsonify({"created": [], "updated": [], "deleted": []}), 200
+
+    try:
+        results = apply_bulk_terms(deck_id, creates, updates, deletes)
+        bump_deck_version(deck_id)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+    invalidate_terms(deck_id)
+
+    refresh_sentence_pool(deck_id, discard=True)
+
+    return jsonify(results), 200
+
+
 @terms_bp.route("/decks/<int:deck_id>/import_terms", methods=["POST"])
 def import_terms_from_csv(deck_id):
     # Check if the deck exists
@@ -157,34 +429,37 @@ def import_terms_from_csv(deck_id):
         return jsonify({"error": "File must be a CSV"}), 400
 
     try:
-        # Read the CSV file
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.reader(stream)
-
-        # Skip the header row if it exists
-        next(csv_reader, None)
-
-        terms_added = 0
-        for row in csv_reader:
-            if (
-                len(row) >= 2
-            ):  # Ensure the row has at least two columns (term and definition)
-                new_term = Term(deck_id=deck_id, term=row[0], definition=row[1])
-                db.session.add(new_term)
-                terms_added += 1
+        report = import_terms(deck_id, file.stream)
+    except Exception as e:
+        db.session.rollback()
+        message, status = import_error(e)
+        return jsonify({"error": message}), status
 
-        db.session.commit()
+    # Also after a partial import: the committed batches are in the deck
+    refresh_sentence_pool(deck_id, discard=True)
 
+    failed = report.pop("failed", None)
+    if failed is not None:
         return (
             jsonify(
                 {
-                    "message": f"Successfully imported {terms_added} terms to deck {deck_id}",
-                    "terms_added": terms_added,
+                    "error": f"Import stopped at line {failed['line']}: {failed['error']}. "
+                    f"{report['rows_accepted']} terms were imported before it",
+                    "failed_line": failed["line"],
+                    "terms_added": report["rows_accepted"],
+                    **report,
                 }
             ),
-            201,
+            failed["status"],
         )
 
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 500
+    return (
+        jsonify(
+            {
+                "message": f"Successfully imported {report['rows_accepted']} terms to deck {deck_id}",
+                "terms_added": report["rows_accepted"],
+                **report,
+            }
+        ),
+        201,
+    )
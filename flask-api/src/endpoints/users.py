@@ -1,27 +1,30 @@
 from flask import Blueprint, jsonify, request
 from src import db
 from src.models import User
+from src.queries import keyset_page, page_args
+from src.serializers import USER_FIELDS, serialize, serialize_many
+from src.storage import read_only
 
 users_bp = Blueprint("users", __name__)
 
 
 @users_bp.route("/users", methods=["GET"])
+@read_only
 def get_users():
-    users = User.query.all()
+    limit, cursor = page_args()
+    users, next_cursor = keyset_page(
+        User.query, User.user_id, lambda user: user.user_id, limit, cursor
+    )
     return jsonify(
-        [
-            {"user_id": user.user_id, "username": user.username, "email": user.email}
-            for user in users
-        ]
+        {"users": serialize_many(users, USER_FIELDS), "next_cursor": next_cursor}
     )
 
 
 @users_bp.route("/users/<int:user_id>", methods=["GET"])
+@read_only
 def get_user(user_id):
     user = User.query.get_or_404(user_id)
-    return jsonify(
-        {"user_id": user.user_id, "username": user.username, "email": user.email}
-    )
+    return jsonify(serialize(user, USER_FIELDS))
 
 
 @users_bp.route("/users", methods=["POST"])
@@ -30,13 +33,4 @@ def create_user():
     new_user = User(username=data["username"], email=data["email"])
     db.session.add(new_user)
     db.session.commit()
-    return (
-        jsonify(
-            {
-                "user_id": new_user.user_id,
-                "username": new_user.username,
-                "email": new_user.email,
-            }
-        ),
-        201,
-    )
+    return jsonify(serialize(new_user, USER_FIELDS)), 201
@@ -0,0 +1,68 @@
+from flask import current_app, request
+from src import db
+from src.models import Deck
+from sqlalchemy import update
+from datetime import date
+import hashlib
+
+
+def bump_deck_version(*deck_ids):
+    # Joins the caller's transaction, so the new version is committed
+    # together with the write it stands for
+    deck_ids = {deck_id for deck_id in deck_ids if deck_id is not None}
+    if deck_ids:
+        db.session.execute(
+            update(Deck)
+            .where(Deck.deck_id.in_(deck_ids))
+            .values(version=Deck.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def list_variant(limit, cursor, columnar=False):
+    # The query parameters that change a list's bytes, as parsed, so
+    # equivalent spellings of a request share a tag
+    cursor = "" if cursor is None else cursor
+    return f"l{limit}-c{cursor}-{'columnar' if columnar else 'rows'}"
+
+
+def deck_etag(kind, deck_id, daily=False, variant=None):
+    """ETag for one of a deck's payloads, from a primary key lookup.
+
+    Also raises the 404 for a missing deck. Payloads with due counts pass
+    `daily`, since those change at midnight without any write. Paged lists
+    pass their `list_variant`, so each page and format gets its own tag.
+    """
+    (version,) = (
+        db.session.query(Deck.version).filter(Deck.deck_id == deck_id).first_or_404()
+    )
+    etag = f"{kind}-{deck_id}-v{version}"
+    if variant is not None:
+        etag = f"{etag}-{variant}"
+    return f"{etag}-{date.today().isoformat()}" if daily else etag
+
+
+def deck_list_etag(kind, versions, variant=None):
+    # versions yields (deck_id, version) for exactly the decks being listed,
+    # so creating, deleting or changing any of them changes the tag
+    digest = hashlib.sha256()
+    for deck_id, version in versions:
+        digest.update(f"{deck_id}:{version},".encode())
+    if variant is not None:
+        digest.update(variant.encode())
+    return f"{kind}-{digest.hexdigest()[:32]}-{date.today().isoformat()}"
+
+
+def etag_matches(etag):
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified(etag):
+    return with_etag(current_app.response_class(status=304), etag)
+
+
+def with_etag(response, etag):
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate it before every use
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -0,0 +1,109 @@
+from flask import current_app
+from src import db
+from src.cache import LRUCache
+from src.models import EvaluationCacheEntry
+from sqlalchemy.dialects.sqlite import insert
+from datetime import datetime, timedelta
+import hashlib, json, re, threading, unicodedata
+
+# Prune the persistent tier once every this many writes
+PRUNE_EVERY = 100
+
+_memory_cache = None
+_memory_cache_lock = threading.Lock()
+_writes_since_prune = 0
+
+
+def get_memory_cache():
+    global _memory_cache
+    with _memory_cache_lock:
+        if _memory_cache is None:
+            _memory_cache = LRUCache(
+                maxsize=current_app.config.get("EVALUATION_CACHE_SIZE", 1024),
+                ttl=current_app.config.get("EVALUATION_CACHE_TTL"),
+            )
+    return _memory_cache
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text or "")).strip()
+
+
+def evaluation_cache_key(
+    model, sentence, machine_translation, user_translation, terms_used
+):
+    parts = [
+        model,
+        normalize(sentence),
+        normalize(machine_translation),
+        normalize(user_translation),
+        json.dumps(terms_used, ensure_ascii=False, sort_keys=True),
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def get_cached_evaluation(cache_key):
+    memory_cache = get_memory_cache()
+    cached = memory_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    entry = db.session.get(EvaluationCacheEntry, cache_key)
+    if entry is None:
+        return None
+
+    ttl = current_app.config.get("EVALUATION_CACHE_TTL")
+    if ttl and entry.created_at < datetime.now() - timedelta(seconds=ttl):
+        return None
+
+    cached = (entry.evaluation_rating, entry.evaluation_text)
+    memory_cache.set(cache_key, cached)
+    return cached
+
+
+def store_evaluation(cache_key, evaluation_rating, evaluation_text):
+    # Joins the caller's transaction; the caller commits
+    global _writes_since_prune
+
+    statement = insert(EvaluationCacheEntry).values(
+        cache_key=cache_key,
+        evaluation_rating=evaluation_rating,
+        evaluation_text=evaluation_text,
+        created_at=datetime.now(),
+    )
+    db.session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={
+                "evaluation_rating": statement.excluded.evaluation_rating,
+                "evaluation_text": statement.excluded.evaluation_text,
+                "created_at": statement.excluded.created_at,
+            },
+        )
+    )
+    get_memory_cache().set(cache_key, (evaluation_rating, evaluation_text))
+
+    _writes_since_prune += 1
+    if _writes_since_prune >= PRUNE_EVERY:
+        _writes_since_prune = 0
+        prune_evaluation_cache()
+
+
+def prune_evaluation_cache():
+    ttl = current_app.config.get("EVALUATION_CACHE_TTL")
+    max_rows = current_app.config.get("EVALUATION_CACHE_MAX_ROWS")
+
+    if ttl:
+        EvaluationCacheEntry.query.filter(
+            EvaluationCacheEntry.created_at < datetime.now() - timedelta(seconds=ttl)
+        ).delete(synchronize_session=False)
+
+    if max_rows:
+        newest = (
+            db.session.query(EvaluationCacheEntry.cache_key)
+            .order_by(EvaluationCacheEntry.created_at.desc())
+            .limit(max_rows)
+        )
+        EvaluationCacheEntry.query.filter(
+            EvaluationCacheEntry.cache_key.notin_(newest)
+        ).delete(synchronize_session=False)
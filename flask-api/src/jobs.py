@@ -0,0 +1,70 @@
+from flask import current_app
+from src import db
+from src.models import Job
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import threading
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get("JOB_WORKERS", 4),
+                thread_name_prefix="jobs",
+            )
+    return _executor
+
+
+def enqueue_job(job_type, fn, *args, deck_id=None):
+    # Record the job before handing it to the pool so its status can be
+    # polled from any worker process sharing the database
+    job = Job(job_type=job_type, deck_id=deck_id, status="queued")
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    get_executor(app).submit(run_job, app, job.job_id, fn, args)
+
+    return job
+
+
+def run_job(app, job_id, fn, args):
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        job.status = "running"
+        job.started_at = datetime.now()
+        db.session.commit()
+
+        try:
+            result = fn(*args)
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.status = "failed"
+            job.error = str(e)
+        else:
+            job = db.session.get(Job, job_id)
+            job.status = "succeeded"
+            job.result = result
+
+        job.finished_at = datetime.now()
+        db.session.commit()
+
+
+def serialize_job(job):
+    return {
+        "job_id": job.job_id,
+        "job_type": job.job_type,
+        "deck_id": job.deck_id,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
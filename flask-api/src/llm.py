@@ -0,0 +1,264 @@
+from flask import current_app
+from src.metrics import LLM_REJECTED, LLM_RETRIES, record_llm_call
+from anthropic import Anthropic, APIConnectionError, APIStatusError
+from contextlib import contextmanager
+import os, random, threading, time
+
+# Upstream responses worth retrying: rate limited and overloaded
+RETRY_STATUSES = (429, 529)
+
+
+class LLMUnavailableError(Exception):
+    """The call was not attempted, or gave up, because the upstream is unhealthy."""
+
+
+def usage_summary(usage):
+    # Cache fields are None when the prefix was too short to be cached
+    return {
+        field: getattr(usage, field, None) or 0
+        for field in (
+            "input_tokens",
+            "output_tokens",
+            "cache_creation_input_tokens",
+            "cache_read_input_tokens",
+        )
+    }
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and fails calls fast for
+    `cooldown` seconds, then lets a single trial call through."""
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight:
+                return False
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def cancel_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+
+class LLMGateway:
+    """Every Anthropic call goes through here.
+
+    Owns the process-wide client (and so its pooled HTTP connections), caps
+    the calls in flight, bounds each call by a deadline, retries 429/529
+    with jittered exponential backoff and trips a circuit breaker when the
+    upstream keeps failing.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_concurrency=8,
+        timeout=60.0,
+        deadline=120.0,
+        max_retries=4,
+        backoff_base=0.5,
+        backoff_max=8.0,
+        breaker_threshold=5,
+        breaker_cooldown=30.0,
+    ):
+        self.client = client
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    @classmethod
+    def from_config(cls, config, client=None):
+        if client is None:
+            client = Anthropic(
+                api_key=os.environ.get("ANTHROPIC_API_KEY"),
+                base_url=config.get("LLM_BASE_URL"),
+                # Retries are done here, within the call's deadline
+                max_retries=0,
+            )
+        return cls(
+            client,
+            max_concurrency=config.get("LLM_MAX_CONCURRENCY", 8),
+            timeout=config.get("LLM_TIMEOUT", 60.0),
+            deadline=config.get("LLM_DEADLINE", 120.0),
+            max_retries=config.get("LLM_MAX_RETRIES", 4),
+            backoff_base=config.get("LLM_BACKOFF_BASE", 0.5),
+            backoff_max=config.get("LLM_BACKOFF_MAX", 8.0),
+            breaker_threshold=config.get("LLM_BREAKER_THRESHOLD", 5),
+            breaker_cooldown=config.get("LLM_BREAKER_COOLDOWN", 30.0),
+        )
+
+    def create(self, operation, **kwargs):
+        with self._call(operation) as attempt:
+            while True:
+                try:
+                    response = self.client.messages.create(
+                        timeout=attempt.timeout(), **kwargs
+                    )
+                except Exception as e:
+                    attempt.retry_or_raise(e)
+                    continue
+                attempt.finish(response.usage)
+                return response
+
+    @contextmanager
+    def stream(self, operation, **kwargs):
+        # Only opening the stream is retried; once text has been yielded to
+        # the caller, a failure is passed on as is
+        with self._call(operation) as attempt:
+            while True:
+                started = False
+                try:
+                    with self.client.messages.stream(
+                        timeout=attempt.timeout(), **kwargs
+                    ) as stream:
+                        started = True
+                        yield stream
+                        usage = stream.get_final_message().usage
+                except Exception as e:
+                    if started:
+                        raise
+                    attempt.retry_or_raise(e)
+                    continue
+                attempt.finish(usage)
+                return
+
+    @contextmanager
+    def _call(self, operation):
+        if not self.breaker.allow():
+            LLM_REJECTED.inc((operation, "circuit_open"))
+            raise LLMUnavailableError("LLM circuit breaker is open; try again later")
+
+        deadline = time.monotonic() + self.deadline
+        if not self._slots.acquire(timeout=self.deadline):
+            # The upstream wasn't involved, so this doesn't count as a failure
+            self.breaker.cancel_trial()
+            LLM_REJECTED.inc((operation, "saturated"))
+            raise LLMUnavailableError("Too many LLM calls in flight")
+
+        attempt = _Attempt(self, operation, deadline)
+        try:
+            yield attempt
+        except Exception as e:
+            if is_upstream_failure(e):
+                self.breaker.record_failure()
+            else:
+                # e.g. a 400, or the caller's own error while streaming
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            # e.g. GeneratorExit when an SSE client disconnects mid-stream;
+            # no outcome either way, but a half-open trial must not stay held
+            self.breaker.cancel_trial()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self._slots.release()
+
+
+class _Attempt:
+    def __init__(self, gateway, operation, deadline):
+        self.gateway = gateway
+        self.operation = operation
+        self.deadline = deadline
+        self.retries = 0
+        self.started = time.perf_counter()
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+    def timeout(self):
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise LLMUnavailableError("LLM call deadline exceeded")
+        return min(self.gateway.timeout, remaining)
+
+    def retry_or_raise(self, error):
+        if not is_retryable(error):
+            raise error
+        if self.retries >= self.gateway.max_retries:
+            raise LLMUnavailableError(
+                f"LLM upstream still busy after {self.retries} retries"
+            ) from error
+
+        # Full jitter, but never sooner than the upstream asked for
+        delay = random.uniform(
+            0,
+            min(self.gateway.backoff_max, self.gateway.backoff_base * 2**self.retries),
+        )
+        delay = max(delay, retry_after(error))
+        if delay >= self.remaining():
+            raise LLMUnavailableError(
+                "LLM upstream busy and too close to the call's deadline to retry"
+            ) from error
+
+        self.retries += 1
+        LLM_RETRIES.inc((self.operation, str(error.status_code)))
+        time.sleep(delay)
+
+    def finish(self, usage):
+        record_llm_call(
+            self.operation, time.perf_counter() - self.started, usage_summary(usage)
+        )
+
+
+def is_retryable(error):
+    return isinstance(error, APIStatusError) and error.status_code in RETRY_STATUSES
+
+
+def is_upstream_failure(error):
+    if isinstance(error, (APIConnectionError, LLMUnavailableError)):
+        return True
+    return isinstance(error, APIStatusError) and (
+        error.status_code in RETRY_STATUSES or error.status_code >= 500
+    )
+
+
+def retry_after(error):
+    try:
+        return float(error.response.headers.get("retry-after", 0))
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def init_llm(app):
+    app.extensions["llm_gateway"] = LLMGateway.from_config(app.config)
+
+
+def get_gateway():
+    return current_app.extensions["llm_gateway"]
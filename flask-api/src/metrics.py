@@ -0,0 +1,254 @@
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from collections import defaultdict
+import bisect, threading, time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ""
+    return (
+        "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+    )
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{format_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (last is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.setdefault(
+                labels, [[0] * (len(self.buckets) + 1), 0.0]
+            )
+            entry[0][index] += 1
+            entry[1] += value
+
+    def collect(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = sorted(
+                (labels, (list(c), s)) for labels, (c, s) in self._values.items()
+            )
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                yield (
+                    f"{self.name}_bucket"
+                    f"{format_labels(self.labelnames, labels, [('le', le)])} {cumulative}"
+                )
+            yield f"{self.name}_sum{format_labels(self.labelnames, labels)} {total:g}"
+            yield f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}"
+
+
+ENDPOINT_LABELS = ("blueprint", "endpoint")
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests handled.",
+    ENDPOINT_LABELS + ("method", "status"),
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from the start of a request until its response was ready.",
+    ENDPOINT_LABELS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size, for responses with a known length.",
+    ENDPOINT_LABELS,
+    SIZE_BUCKETS,
+)
+SQL_STATEMENTS = Counter(
+    "db_statements_total",
+    "SQL statements executed.",
+    ENDPOINT_LABELS,
+)
+SQL_TIME = Counter(
+    "db_statement_seconds_total",
+    "Time spent executing SQL statements.",
+    ENDPOINT_LABELS,
+)
+SQL_STATEMENTS_PER_REQUEST = Histogram(
+    "db_statements_per_request",
+    "SQL statements executed per request.",
+    ENDPOINT_LABELS,
+    STATEMENT_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM API calls.",
+    ("operation",),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported by LLM API responses.",
+    ("operation", "type"),
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "LLM API calls retried after a rate-limited or overloaded response.",
+    ("operation", "status"),
+)
+LLM_REJECTED = Counter(
+    "llm_rejected_total",
+    "LLM API calls refused by the gateway without reaching the upstream.",
+    ("operation", "reason"),
+)
+
+REGISTRY = (
+    REQUESTS,
+    REQUEST_LATENCY,
+    RESPONSE_SIZE,
+    SQL_STATEMENTS,
+    SQL_TIME,
+    SQL_STATEMENTS_PER_REQUEST,
+    LLM_LATENCY,
+    LLM_TOKENS,
+    LLM_RETRIES,
+    LLM_REJECTED,
+)
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+def endpoint_labels():
+    if not has_request_context():
+        # Work done outside a request, e.g. background jobs
+        return ("", "background")
+    return (request.blueprint or "", request.endpoint or "unmatched")
+
+
+def record_llm_call(operation, seconds, usage):
+    LLM_LATENCY.observe((operation,), seconds)
+    for token_type in (
+        "input_tokens",
+        "output_tokens",
+        "cache_creation_input_tokens",
+        "cache_read_input_tokens",
+    ):
+        amount = usage.get(token_type)
+        if amount:
+            LLM_TOKENS.inc((operation, token_type.removesuffix("_tokens")), amount)
+
+
+def init_metrics(app, db):
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", after_cursor_execute)
+            event.listen(engine, "handle_error", handle_error)
+
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    labels = endpoint_labels()
+    SQL_STATEMENTS.inc(labels)
+    SQL_TIME.inc(labels, elapsed)
+
+    if has_request_context() and "metrics_start" in g:
+        g.sql_count += 1
+        if g.sql_statements is not None:
+            g.sql_statements.append((elapsed, statement))
+
+
+def handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute, so drop its
+    # start time here or the connection's stack keeps growing
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+
+def start_request():
+    g.metrics_start = time.perf_counter()
+    g.sql_count = 0
+    # Only keep the statement text when it may be needed for the slow log
+    g.sql_statements = [] if current_app.config.get("SLOW_REQUEST_SECONDS") else None
+
+
+def finish_request(response):
+    if "metrics_start" not in g:
+        return response
+
+    # Streamed responses are measured up to the point their body starts
+    elapsed = time.perf_counter() - g.metrics_start
+    labels = endpoint_labels()
+
+    REQUESTS.inc(labels + (request.method, str(response.status_code)))
+    REQUEST_LATENCY.observe(labels, elapsed)
+    SQL_STATEMENTS_PER_REQUEST.observe(labels, g.sql_count)
+    if not response.is_streamed:
+        RESPONSE_SIZE.observe(labels, response.calculate_content_length() or 0)
+
+    threshold = current_app.config.get("SLOW_REQUEST_SECONDS")
+    if threshold and elapsed >= threshold:
+        current_app.logger.warning(
+            "Slow request %s %s (%s): %.3fs, %d SQL statements\n%s",
+            request.method,
+            request.path,
+            request.endpoint,
+            elapsed,
+            g.sql_count,
+            "\n".join(
+                f"  {seconds * 1000:8.2f}ms  {' '.join(statement.split())}"
+                for seconds, statement in g.sql_statements
+            ),
+        )
+
+    return response
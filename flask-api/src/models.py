@@ -9,15 +9,17 @@ class User(db.Model):
     user_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     username = db.Column(db.String, unique=True, nullable=False)
     email = db.Column(db.String, unique=True, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
     # Relationships
-    decks = db.relationship("Deck", back_populates="user", lazy="dynamic")
+    decks = db.relationship(
+        "Deck", back_populates="user", lazy="dynamic", passive_deletes=True
+    )
     user_term_data = db.relationship(
-        "UserTermData", back_populates="user", lazy="dynamic"
+        "UserTermData", back_populates="user", lazy="dynamic", passive_deletes=True
     )
     review_history = db.relationship(
-        "ReviewHistory", back_populates="user", lazy="dynamic"
+        "ReviewHistory", back_populates="user", lazy="dynamic", passive_deletes=True
     )
 
     def __repr__(self):
@@ -28,21 +30,29 @@ class Deck(db.Model):
     __tablename__ = "decks"
 
     deck_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False
+    )
     deck_name = db.Column(db.String, nullable=False)
     user_language = db.Column(db.String)
     deck_language = db.Column(db.String)
     is_public = db.Column(db.Boolean, default=False, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    # Bumped by every write that changes the deck's payloads; see src/etags.py
+    version = db.Column(db.Integer, nullable=False, default=1)
+    # Set by a soft delete; the deck is hidden until src/deletion.py purges it
+    deleted_at = db.Column(db.DateTime)
 
     # Relationships
     user = db.relationship("User", back_populates="decks")
-    terms = db.relationship("Term", back_populates="deck", lazy="dynamic")
+    terms = db.relationship(
+        "Term", back_populates="deck", lazy="dynamic", passive_deletes=True
+    )
     generated_sentences = db.relationship(
-        "GeneratedSentence", back_populates="deck", lazy="dynamic"
+        "GeneratedSentence", back_populates="deck", lazy="dynamic", passive_deletes=True
     )
     archived_sentences = db.relationship(
-        "ArchivedSentence", back_populates="deck", lazy="dynamic"
+        "ArchivedSentence", back_populates="deck", lazy="dynamic", passive_deletes=True
     )
 
     def __repr__(self):
@@ -53,18 +63,20 @@ class Term(db.Model):
     __tablename__ = "terms"
 
     term_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    deck_id = db.Column(db.Integer, db.ForeignKey("decks.deck_id"), nullable=False)
+    deck_id = db.Column(
+        db.Integer, db.ForeignKey("decks.deck_id", ondelete="CASCADE"), nullable=False
+    )
     term = db.Column(db.String, nullable=False)
     definition = db.Column(db.String, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
     # Relationships
     deck = db.relationship("Deck", back_populates="terms")
     user_term_data = db.relationship(
-        "UserTermData", back_populates="term", lazy="dynamic"
+        "UserTermData", back_populates="term", lazy="dynamic", passive_deletes=True
     )
     review_history = db.relationship(
-        "ReviewHistory", back_populates="term", lazy="dynamic"
+        "ReviewHistory", back_populates="term", lazy="dynamic", passive_deletes=True
     )
 
     def __repr__(self):
@@ -75,8 +87,15 @@ class UserTermData(db.Model):
     __tablename__ = "user_term_data"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
-    term_id = db.Column(db.Integer, db.ForeignKey("terms.term_id"), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False
+    )
+    term_id = db.Column(
+        db.Integer,
+        db.ForeignKey("terms.term_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
     last_reviewed = db.Column(db.DateTime)
     next_review = db.Column(db.DateTime)
     ease_factor = db.Column(db.Float, default=2.5)
@@ -86,7 +105,11 @@ class UserTermData(db.Model):
     user = db.relationship("User", back_populates="user_term_data")
     term = db.relationship("Term", back_populates="user_term_data")
 
-    __table_args__ = (db.UniqueConstraint("user_id", "term_id", name="_user_term_uc"),)
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "term_id", name="_user_term_uc"),
+        db.Index("idx_user_term_data", "user_id", "term_id"),
+        db.Index("idx_user_term_next_review", "user_id", "next_review"),
+    )
 
     def __repr__(self):
         return f"<UserTermData user_id={self.user_id} term_id={self.term_id}>"
@@ -96,9 +119,16 @@ class ReviewHistory(db.Model):
     __tablename__ = "review_history"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.user_id"), nullable=False)
-    term_id = db.Column(db.Integer, db.ForeignKey("terms.term_id"), nullable=False)
-    review_date = db.Column(db.DateTime, default=datetime.now(), nullable=False)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False
+    )
+    term_id = db.Column(
+        db.Integer,
+        db.ForeignKey("terms.term_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    review_date = db.Column(db.DateTime, default=datetime.now, nullable=False)
     rating = db.Column(db.Integer, nullable=False)
 
     user = db.relationship("User", back_populates="review_history")
@@ -110,11 +140,42 @@ class ReviewHistory(db.Model):
         )
 
 
+class ReviewDailyStat(db.Model):
+    # Daily rollup of review_history for the analytics endpoints, kept up to
+    # date by rate_anki_card and rebuilt with `flask backfill-review-stats`
+    __tablename__ = "review_daily_stats"
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.user_id", ondelete="CASCADE"), primary_key=True
+    )
+    deck_id = db.Column(
+        db.Integer,
+        db.ForeignKey("decks.deck_id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+    review_day = db.Column(db.Date, primary_key=True)
+    rating = db.Column(db.Integer, primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("idx_review_daily_stats_user_day", "user_id", "review_day"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<ReviewDailyStat user_id={self.user_id} deck_id={self.deck_id}"
+            f" {self.review_day} rating={self.rating}>"
+        )
+
+
 class GeneratedSentence(db.Model):
     __tablename__ = "generated_sentences"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    deck_id = db.Column(db.Integer, db.ForeignKey("decks.deck_id"), nullable=False)
+    deck_id = db.Column(
+        db.Integer, db.ForeignKey("decks.deck_id", ondelete="CASCADE"), nullable=False
+    )
     user_lang_given = db.Column(db.Boolean, nullable=False)
     sentence = db.Column(db.Text, nullable=False)
     machine_translation = db.Column(db.Text, nullable=False)
@@ -123,10 +184,21 @@ class GeneratedSentence(db.Model):
     user_translation = db.Column(db.Text)
     evaluation_rating = db.Column(db.Integer)
     evaluation_text = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.now())
+    # Pre-generated and not yet served; hidden from the deck until claimed
+    pooled = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
 
     # Relationship
     deck = db.relationship("Deck", back_populates="generated_sentences")
+    term_links = db.relationship(
+        "SentenceTerm", back_populates="generated_sentence", passive_deletes=True
+    )
+
+    __table_args__ = (
+        db.Index(
+            "idx_generated_sentences_pool", "deck_id", "pooled", "user_lang_given"
+        ),
+    )
 
     @property
     def terms_used(self):
@@ -152,7 +224,9 @@ class ArchivedSentence(db.Model):
     __tablename__ = "archived_sentences"
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    deck_id = db.Column(db.Integer, db.ForeignKey("decks.deck_id"), nullable=False)
+    deck_id = db.Column(
+        db.Integer, db.ForeignKey("decks.deck_id", ondelete="CASCADE"), nullable=False
+    )
     user_lang_given = db.Column(db.Boolean, nullable=False)
     sentence = db.Column(db.Text, nullable=False)
     machine_translation = db.Column(db.Text, nullable=False)
@@ -161,10 +235,15 @@ class ArchivedSentence(db.Model):
     user_translation = db.Column(db.Text)
     evaluation_rating = db.Column(db.Integer)
     evaluation_text = db.Column(db.Text)
-    archived_at = db.Column(db.DateTime, default=datetime.now())
+    archived_at = db.Column(db.DateTime, default=datetime.now)
+    # id the sentence had in generated_sentences, used to carry its term links over
+    generated_sentence_id = db.Column(db.Integer, index=True)
 
     # Relationships
     deck = db.relationship("Deck", back_populates="archived_sentences")
+    term_links = db.relationship(
+        "SentenceTerm", back_populates="archived_sentence", passive_deletes=True
+    )
 
     @property
     def terms_used(self):
@@ -184,3 +263,79 @@ class ArchivedSentence(db.Model):
 
     def __repr__(self):
         return f"<ArchivedSentence {self.sentence[:20]}...>"
+
+
+class SentenceTerm(db.Model):
+    __tablename__ = "sentence_terms"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    deck_id = db.Column(
+        db.Integer, db.ForeignKey("decks.deck_id", ondelete="CASCADE"), nullable=False
+    )
+    # Exactly one of these is set; links move to the archived row on archive
+    generated_sentence_id = db.Column(
+        db.Integer,
+        db.ForeignKey("generated_sentences.id", ondelete="CASCADE"),
+        index=True,
+    )
+    archived_sentence_id = db.Column(
+        db.Integer,
+        db.ForeignKey("archived_sentences.id", ondelete="CASCADE"),
+        index=True,
+    )
+    # term_id is set when the term matches one in the deck
+    term_id = db.Column(
+        db.Integer, db.ForeignKey("terms.term_id", ondelete="SET NULL"), index=True
+    )
+    term = db.Column(db.String, nullable=False)
+    definition = db.Column(db.String)
+    is_new = db.Column(db.Boolean, nullable=False, default=False)
+
+    generated_sentence = db.relationship(
+        "GeneratedSentence", back_populates="term_links"
+    )
+    archived_sentence = db.relationship("ArchivedSentence", back_populates="term_links")
+
+    __table_args__ = (db.Index("idx_sentence_terms_deck_term", "deck_id", "term"),)
+
+    def __repr__(self):
+        return f"<SentenceTerm {self.term}>"
+
+
+class Job(db.Model):
+    __tablename__ = "jobs"
+
+    job_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_type = db.Column(db.String, nullable=False)
+    deck_id = db.Column(
+        db.Integer, db.ForeignKey("decks.deck_id", ondelete="SET NULL"), index=True
+    )
+    status = db.Column(db.String, nullable=False, default="queued")
+    result_json = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def result(self):
+        return json.loads(self.result_json) if self.result_json else None
+
+    @result.setter
+    def result(self, value):
+        self.result_json = json.dumps(value)
+
+    def __repr__(self):
+        return f"<Job {self.job_id} {self.job_type} {self.status}>"
+
+
+class EvaluationCacheEntry(db.Model):
+    __tablename__ = "evaluation_cache"
+
+    cache_key = db.Column(db.String, primary_key=True)
+    evaluation_rating = db.Column(db.Integer, nullable=False)
+    evaluation_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+
+    def __repr__(self):
+        return f"<EvaluationCacheEntry {self.cache_key[:12]}>"
@@ -0,0 +1,87 @@
+from flask import request
+from src import db
+from src.models import Deck, Term, UserTermData
+from sqlalchemy import case, func
+from bisect import bisect_right
+from datetime import datetime, time, timedelta
+
+
+def deck_summary_query(*criteria):
+    """Decks with their term and due counts, as (Deck, term_count, due_count).
+
+    The counts come from one grouped subquery instead of a COUNT per deck.
+    `criteria` filter on Deck and are pushed into the subquery as well, so
+    only the terms of the selected decks get aggregated. Due counts are for
+    the deck owner.
+    """
+    tomorrow = datetime.combine(datetime.now().date() + timedelta(days=1), time.min)
+    is_due = (UserTermData.next_review == None) | (UserTermData.next_review < tomorrow)
+
+    counts = (
+        db.session.query(
+            Term.deck_id.label("deck_id"),
+            func.count(Term.term_id).label("term_count"),
+            func.sum(case((is_due, 1), else_=0)).label("due_count"),
+        )
+        .join(Deck, Deck.deck_id == Term.deck_id)
+        .outerjoin(
+            UserTermData,
+            (UserTermData.term_id == Term.term_id)
+            & (UserTermData.user_id == Deck.user_id),
+        )
+        .filter(*criteria)
+        .group_by(Term.deck_id)
+        .subquery()
+    )
+
+    return (
+        db.session.query(
+            Deck,
+            func.coalesce(counts.c.term_count, 0),
+            func.coalesce(counts.c.due_count, 0),
+        )
+        .outerjoin(counts, counts.c.deck_id == Deck.deck_id)
+        .filter(*criteria)
+    )
+
+
+MAX_PAGE_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+
+
+def page_args():
+    # Every paginated list returns at most DEFAULT_PAGE_SIZE rows unless
+    # asked for more, and callers follow next_cursor for the rest
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    cursor = request.args.get("cursor", type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE)), cursor
+
+
+def keyset_page(query, key_column, key_of, limit=None, cursor=None):
+    """Return (rows, next_cursor) for rows after `cursor` in `key_column` order.
+
+    `key_of` reads the key back out of a result row. `next_cursor` is None
+    once the last page has been returned.
+    """
+    if cursor is not None:
+        query = query.filter(key_column > cursor)
+    query = query.order_by(key_column)
+
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, key_of(rows[-1])
+
+
+def keyset_slice(rows, key_of, limit=None, cursor=None):
+    # keyset_page over a list that is already in key order, e.g. cached rows
+    if cursor is not None:
+        rows = rows[bisect_right(rows, cursor, key=key_of) :]
+    if limit is None or len(rows) <= limit:
+        return list(rows), None
+    rows = rows[:limit]
+    return list(rows), key_of(rows[-1])
@@ -0,0 +1,141 @@
+import re
+
+# "Sentence: ...", tolerating list markers, markdown bold and odd spacing
+FIELD_PATTERN = re.compile(
+    r"^[\s>*#-]*(?:\d+[.)]\s*)?\**\s*"
+    r"(sentence|translation|terms used|new terms)"
+    r"\s*\**\s*:\s*\**\s*(.*?)\s*$",
+    re.IGNORECASE,
+)
+FIELDS = {
+    "sentence": "sentence",
+    "translation": "translation",
+    "terms used": "terms_used",
+    "new terms": "new_terms",
+}
+REQUIRED_FIELDS = ("sentence", "translation", "terms_used")
+
+
+def parse_term_pairs(value):
+    pairs = []
+    for pair in value.split("|||"):
+        # Split on the first ::: only; any further ::: separate alternative definitions
+        term, separator, definition = pair.partition(":::")
+        term = term.strip()
+        if separator and term:
+            definitions = (part.strip() for part in definition.split(":::"))
+            pairs.append((term, "; ".join(part for part in definitions if part)))
+    return pairs
+
+
+class SentenceParser:
+    """Single-pass parser for the Sentence/Translation/Terms used/New terms format.
+
+    Text can be fed in arbitrary chunks (e.g. from a streaming response);
+    `feed` and `close` return the sentences completed by that call. Blocks
+    that cannot be used are collected in `rejected` with a reason.
+    """
+
+    def __init__(self, all_term_set, user_lang_given=False):
+        self.all_term_set = all_term_set
+        self.user_lang_given = user_lang_given
+        self.sentences = []
+        self.rejected = []
+        self._pending = ""
+        self._block = None
+        self._field = None
+
+    def feed(self, text):
+        completed = []
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._parse_line(line, completed)
+        return completed
+
+    def close(self):
+        completed = []
+        if self._pending:
+            self._parse_line(self._pending, completed)
+            self._pending = ""
+        self._finish_block(completed)
+        return completed
+
+    def _parse_line(self, line, completed):
+        if not line.strip():
+            # A blank line only ends a block once its last field has been seen;
+            # otherwise the next "Sentence:" line does
+            if self._block and "new_terms" in self._block["fields"]:
+                self._finish_block(completed)
+            return
+
+        match = FIELD_PATTERN.match(line)
+        if match:
+            field = FIELDS[match.group(1).lower()]
+            if (
+                self._block is None
+                or field == "sentence"
+                or field in self._block["fields"]
+            ):
+                self._finish_block(completed)
+                self._block = {"fields": {}, "lines": []}
+            self._block["fields"][field] = match.group(2)
+            self._block["lines"].append(line)
+            self._field = field
+        elif self._block is not None and self._field is not None:
+            # Continuation of a field that wrapped onto another line
+            fields = self._block["fields"]
+            fields[self._field] = f"{fields[self._field]} {line.strip()}".strip()
+            self._block["lines"].append(line)
+        # Anything else is commentary outside a block and is ignored
+
+    def _finish_block(self, completed):
+        block, self._block, self._field = self._block, None, None
+        if block is None:
+            return
+
+        fields = block["fields"]
+        missing = [
+            field
+            for field in REQUIRED_FIELDS
+            if field not in fields or (field != "terms_used" and not fields[field])
+        ]
+        if missing:
+            self.rejected.append(
+                {
+                    "block": "\n".join(block["lines"]),
+                    "reason": "missing " + ", ".join(missing),
+                }
+            )
+            return
+
+        sentence, translation = fields["sentence"], fields["translation"]
+        if self.user_lang_given:
+            sentence, translation = translation, sentence
+
+        terms_used = {}
+        new_terms = {}
+        for term, definition in parse_term_pairs(fields["terms_used"]):
+            if term.lower() in self.all_term_set:
+                terms_used[term] = definition
+            else:
+                new_terms[term] = definition
+        for term, definition in parse_term_pairs(fields.get("new_terms", "")):
+            if term.lower() not in self.all_term_set:
+                new_terms[term] = definition
+
+        parsed = {
+            "sentence": sentence,
+            "translation": translation,
+            "terms_used": terms_used,
+            "new_terms": new_terms,
+        }
+        self.sentences.append(parsed)
+        completed.append(parsed)
+
+
+def parse_sentences(text, all_term_set, user_lang_given=False):
+    parser = SentenceParser(all_term_set, user_lang_given)
+    parser.feed(text)
+    parser.close()
+    return parser.sentences, parser.rejected
@@ -0,0 +1,193 @@
+"""Serialization for the models in src/models.py, and the app's JSON provider.
+
+Endpoints pick the fields they return from the tuples below and pass model
+instances (or column rows with the same attribute names) to `serialize` or
+`serialize_many`. The stored `terms_used_json`/`new_terms_json` text is
+spliced into the response as is, rather than decoded and encoded again.
+
+Encoding uses orjson when it is installed and falls back to the standard
+library otherwise. Either way datetimes come out as ISO 8601 strings.
+"""
+
+from flask import request
+from flask.json.provider import JSONProvider
+from datetime import date
+from operator import attrgetter
+import dataclasses, decimal, json, re, secrets, uuid
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+USER_FIELDS = ("user_id", "username", "email")
+DECK_FIELDS = (
+    "deck_id",
+    "user_id",
+    "deck_name",
+    "user_language",
+    "deck_language",
+    "is_public",
+    "created_at",
+)
+TERM_FIELDS = ("term_id", "deck_id", "term", "definition", "created_at")
+# Terms listed under their deck leave out the deck_id
+TERM_LIST_FIELDS = ("term_id", "term", "definition", "created_at")
+SENTENCE_FIELDS = (
+    "id",
+    "deck_id",
+    "user_lang_given",
+    "sentence",
+    "machine_translation",
+    "user_translation",
+    "terms_used",
+    "new_terms",
+    "evaluation_rating",
+    "evaluation_text",
+    "created_at",
+)
+
+# Stored JSON columns, served under the name of their decoded property
+RAW_JSON_COLUMNS = {"terms_used": "terms_used_json", "new_terms": "new_terms_json"}
+
+LIST_FORMATS = ("rows", "columnar")
+
+
+class RawJSON:
+    """Already-encoded JSON text, written into the output verbatim."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+
+def field_getter(field):
+    column = RAW_JSON_COLUMNS.get(field)
+    if column is None:
+        return attrgetter(field)
+    read_column = attrgetter(column)
+    return lambda obj: RawJSON(read_column(obj))
+
+
+def columns(model, fields):
+    # The model columns backing `fields`, for queries that skip the ORM objects
+    return [getattr(model, RAW_JSON_COLUMNS.get(field, field)) for field in fields]
+
+
+def serialize(obj, fields):
+    return {field: field_getter(field)(obj) for field in fields}
+
+
+def serialize_many(objs, fields, columnar=False):
+    """A list of dicts, or with `columnar`, a dict of per-field lists.
+
+    The columnar form repeats no keys, which makes large lists noticeably
+    smaller and cheaper to encode and parse.
+    """
+    objs = list(objs)
+    if objs and is_column_row(objs[0], fields):
+        return serialize_rows(objs, fields, columnar)
+
+    getters = [(field, field_getter(field)) for field in fields]
+    if columnar:
+        return {field: [getter(obj) for obj in objs] for field, getter in getters}
+    return [{field: getter(obj) for field, getter in getters} for obj in objs]
+
+
+def is_column_row(obj, fields):
+    # A row from a query over columns(model, fields), in the same order
+    return getattr(obj, "_fields", None) == tuple(
+        RAW_JSON_COLUMNS.get(field, field) for field in fields
+    )
+
+
+def serialize_rows(rows, fields, columnar):
+    # Positional access is several times faster than attribute access on rows
+    raw = [index for index, field in enumerate(fields) if field in RAW_JSON_COLUMNS]
+    if columnar:
+        values = [list(column) for column in zip(*rows)]
+        for index in raw:
+            values[index] = [RawJSON(text) for text in values[index]]
+        return dict(zip(fields, values))
+
+    if not raw:
+        return [dict(zip(fields, row)) for row in rows]
+    serialized = []
+    for row in rows:
+        row = list(row)
+        for index in raw:
+            row[index] = RawJSON(row[index])
+        serialized.append(dict(zip(fields, row)))
+    return serialized
+
+
+def list_format():
+    # ?format=columnar, for the endpoints that return large lists
+    value = request.args.get("format", "rows")
+    if value not in LIST_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(LIST_FORMATS)}")
+    return value == "columnar"
+
+
+def encode_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(obj):
+    fragments = []
+    # Raw fragments are encoded as marker strings and swapped in afterwards;
+    # the random token keeps user text from ever matching a marker
+    token = secrets.token_hex(8)
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.text)
+            return f"\x00{token}{len(fragments) - 1}\x00"
+        return encode_default(value)
+
+    if orjson is not None:
+        encoded = orjson.dumps(
+            obj,
+            default=default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
+    else:
+        encoded = json.dumps(
+            obj, default=default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    if not fragments:
+        return encoded
+    marker = re.compile(rb'"\\u0000' + token.encode() + rb'(\d+)\\u0000"')
+    return marker.sub(
+        lambda match: fragments[int(match.group(1))].encode("utf-8"), encoded
+    )
+
+
+class FastJSONProvider(JSONProvider):
+    """Backs jsonify and request.json with dumps_bytes and orjson."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -0,0 +1,99 @@
+import numpy as np
+
+MINUTE = 1 / 1440
+
+# Fallback rating mix (Again, Hard, Good, Easy) used when a user has no history yet
+DEFAULT_RATING_PROBABILITIES = (0.1, 0.15, 0.5, 0.25)
+
+
+def next_intervals(ratings, intervals, ease_factors):
+    # Vectorized mirror of anki.calculate_next_interval
+    is_new = intervals < 10 * MINUTE
+    good = np.where(is_new, 15 * MINUTE, intervals * ease_factors)
+    easy = np.where(is_new, 3.0, intervals * ease_factors * 1.5)
+    good = np.where(is_new | (good < 30 * MINUTE), good, 1.0)
+    easy = np.where(is_new | (easy < 30 * MINUTE), easy, 1.0)
+
+    return np.select(
+        [ratings == 1, ratings == 2, ratings == 3, ratings == 4],
+        [MINUTE, 3 * MINUTE, good, easy],
+        default=np.maximum(intervals, 1) * ease_factors,
+    )
+
+
+def next_ease_factors(ratings, ease_factors):
+    # Vectorized mirror of anki.update_ease_factor
+    return np.select(
+        [ratings == 4, ratings == 3, ratings == 2],
+        [
+            np.minimum(ease_factors + 0.2, 2.5),
+            ease_factors,
+            np.maximum(1.3, ease_factors - 0.15),
+        ],
+        default=np.maximum(1.3, ease_factors - 0.2),
+    )
+
+
+def rating_distribution(rating_counts):
+    counts = np.zeros(4)
+    for rating, count in rating_counts:
+        if 1 <= rating <= 4:
+            counts[rating - 1] += count
+    if counts.sum() == 0:
+        return np.array(DEFAULT_RATING_PROBABILITIES)
+    return counts / counts.sum()
+
+
+def simulate_review_load(
+    due_in,
+    intervals,
+    ease_factors,
+    groups,
+    group_count,
+    days,
+    day_offset=0.0,
+    rating_probabilities=DEFAULT_RATING_PROBABILITIES,
+    seed=None,
+    runs=1,
+    max_steps=10000,
+):
+    """Replay the scheduler over every card at once, `runs` times.
+
+    `due_in` is the number of days until each card is next due (<= 0 for
+    overdue or new cards) and `day_offset` is the fraction of today that has
+    already elapsed. The runs are independent copies of the deck simulated
+    side by side, and each step reviews every card still inside the horizon
+    once, so the loop runs per review round rather than per card.
+
+    Returns (counts, truncated): a (group_count, days) array of review counts
+    averaged over the runs, so a single run is one random sample rather than
+    an expectation, and whether `max_steps` rounds ran out before every card
+    left the horizon, leaving later days undercounted.
+    """
+    rng = np.random.default_rng(seed)
+    clock = np.maximum(np.asarray(due_in, dtype=float), 0.0) + day_offset
+    clock = np.tile(clock, runs)
+    intervals = np.tile(np.asarray(intervals, dtype=float), runs)
+    ease_factors = np.tile(np.asarray(ease_factors, dtype=float), runs)
+    groups = np.tile(np.asarray(groups, dtype=np.int64), runs)
+    counts = np.zeros(group_count * days, dtype=np.int64)
+
+    truncated = True
+    for _ in range(max_steps):
+        active = np.flatnonzero(clock < days)
+        if active.size == 0:
+            truncated = False
+            break
+
+        day_index = clock[active].astype(np.int64)
+        counts += np.bincount(
+            groups[active] * days + day_index, minlength=group_count * days
+        )
+
+        ratings = rng.choice(4, size=active.size, p=rating_probabilities) + 1
+        new_intervals = next_intervals(ratings, intervals[active], ease_factors[active])
+        ease_factors[active] = next_ease_factors(ratings, ease_factors[active])
+        intervals[active] = new_intervals
+        clock[active] += new_intervals
+
+    return counts.reshape(group_count, days) / runs, truncated
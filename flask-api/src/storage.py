@@ -0,0 +1,75 @@
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from functools import wraps
+import math, sqlite3
+
+READ_BIND = "readonly"
+
+
+def configure_storage(app):
+    # Must run before db.init_app, which creates the engines
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    in_memory = url.database in (None, "", ":memory:")
+    pool_size = app.config.get("READ_POOL_SIZE", 0)
+
+    if url.drivername.startswith("sqlite") and pool_size and not in_memory:
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds[READ_BIND] = {"url": str(url), "pool_size": pool_size}
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_storage(app, db):
+    profile_name = app.config.get("STORAGE_PROFILE", "legacy")
+    profiles = app.config.get("STORAGE_PROFILES", {})
+    if profile_name not in profiles:
+        raise ValueError(f"Unknown STORAGE_PROFILE {profile_name!r}")
+    pragmas = profiles[profile_name]
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            if engine.dialect.name == "sqlite":
+                event.listen(
+                    engine,
+                    "connect",
+                    pragma_listener(pragmas, query_only=bind_key == READ_BIND),
+                )
+
+
+def pragma_listener(pragmas, query_only=False):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Off by default in SQLite, and the ON DELETE actions depend on it
+        cursor.execute("PRAGMA foreign_keys = ON")
+        # Builds without the math functions still need ln() for key term sampling
+        try:
+            cursor.execute("SELECT ln(1)")
+        except sqlite3.OperationalError:
+            dbapi_connection.create_function("ln", 1, math.log, deterministic=True)
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if query_only:
+            cursor.execute("PRAGMA query_only = ON")
+        cursor.close()
+
+    return set_pragmas
+
+
+def read_only(view):
+    # Route this endpoint's queries to the read pool, when one is configured
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context() and g.get("read_only"):
+            engine = self._db.engines.get(READ_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
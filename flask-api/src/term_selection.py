@@ -0,0 +1,93 @@
+"""Which of a deck's terms go into a sentence generation prompt.
+
+Key terms, the ones the sentences are written for, are drawn in SQL and
+favour the deck owner's due cards, lapsed (low ease) ones most. The rest of
+the deck is listed as context up to GENERATION_TERM_TOKEN_BUDGET, so the
+prompt stops growing with the deck.
+"""
+
+from src import db
+from src.models import Term, UserTermData
+from src.serializers import TERM_LIST_FIELDS, columns
+from sqlalchemy import Integer, case, func, type_coerce
+from datetime import datetime
+
+# Relative odds of being drawn as a key term. Each point of ease lost to
+# lapses adds LAPSE_WEIGHT on top of DUE_WEIGHT. Most of a mature deck is
+# not due, so those terms get a small weight and still fill in when few
+# cards are due.
+DUE_WEIGHT = 4.0
+LAPSE_WEIGHT = 4.0
+NEW_WEIGHT = 2.0
+NOT_DUE_WEIGHT = 0.25
+DEFAULT_EASE_FACTOR = 2.5
+
+
+def select_key_terms(deck, count):
+    """Up to `count` of the deck's terms, as column rows in drawn order.
+
+    A weighted sample without replacement (Efraimidis-Spirakis): each term
+    gets the key -ln(u) / weight for a uniform random u, and the lowest
+    keys win. Only `count` rows leave the database.
+    """
+    weight = case(
+        (UserTermData.next_review == None, NEW_WEIGHT),
+        (
+            UserTermData.next_review <= datetime.now(),
+            # Floored at 0, so an ease above the default (stored before
+            # ratings clamped it) can't make the weight zero or negative
+            DUE_WEIGHT
+            + LAPSE_WEIGHT
+            * func.max(
+                0.0,
+                DEFAULT_EASE_FACTOR
+                - func.coalesce(UserTermData.ease_factor, DEFAULT_EASE_FACTOR),
+            ),
+        ),
+        else_=NOT_DUE_WEIGHT,
+    )
+    # In (0, 1], so ln() is always defined
+    uniform = (func.abs(type_coerce(func.random(), Integer) % 1000000) + 1) / 1000000.0
+
+    return (
+        db.session.query(*columns(Term, TERM_LIST_FIELDS))
+        .outerjoin(
+            UserTermData,
+            (UserTermData.term_id == Term.term_id)
+            & (UserTermData.user_id == deck.user_id),
+        )
+        .filter(Term.deck_id == deck.deck_id)
+        .order_by(-func.ln(uniform) / weight)
+        .limit(count)
+        .all()
+    )
+
+
+def select_context_terms(terms, budget=None):
+    """The oldest terms whose prompt lines fit in `budget` tokens, in term_id order.
+
+    The list is part of the cached prompt prefix, so it only depends on the
+    deck's terms and not on the key terms or review state. No budget (None
+    or 0) means the whole deck.
+    """
+    terms = sorted(terms, key=lambda term: term.term_id)
+    if not budget:
+        return terms
+
+    selected = []
+    for term in terms:
+        budget -= estimate_tokens(term_line(term))
+        if budget < 0:
+            break
+        selected.append(term)
+    return selected
+
+
+def term_line(term):
+    return f"Term: {term.term} : {term.definition}"
+
+
+def estimate_tokens(text):
+    # Errs high: Latin text averages about 4 bytes per token, and Hangul or
+    # CJK about one token per 3-byte character
+    return len(text.encode("utf-8")) // 3 + 1
@@ -0,0 +1,25 @@
+// Follows next_cursor until the list ends. Returns the first page's payload
+// with `key` holding the items of every page.
+export default async function fetchAllPages(url, key, errorMessage) {
+  const pageSize = 1000; // the API's largest page
+  let payload = null;
+  let items = [];
+  let cursor = null;
+
+  do {
+    const params = new URLSearchParams({ limit: pageSize });
+    if (cursor !== null) {
+      params.set('cursor', cursor);
+    }
+    const response = await fetch(`${url}?${params}`);
+    if (!response.ok) {
+      throw new Error(errorMessage);
+    }
+    const data = await response.json();
+    payload = payload || data;
+    items = items.concat(data[key]);
+    cursor = data.next_cursor ?? null;
+  } while (cursor !== null);
+
+  return { ...payload, [key]: items, next_cursor: null };
+}
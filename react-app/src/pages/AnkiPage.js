@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Heap } from 'heap-js';
 import { useParams, Link } from 'react-router-dom';
 import './AnkiPage.css';
@@ -12,6 +12,19 @@ const AnkiPage = () => {
   const [cardHeap, setCardHeap] = useState(new Heap((a, b) => new Date(a.nextReview) - new Date(b.nextReview)));
   const [isStudyComplete, setIsStudyComplete] = useState(false);
   const [nextIntervals, setNextIntervals] = useState(null);
+  const nextCursor = useRef(null);
+  // term_ids in the heap or on screen, so a page from the server never
+  // queues a card the client already requeued
+  const queuedIds = useRef(new Set());
+
+  const queueCards = (cards) => {
+    cards.forEach(card => {
+      if (!queuedIds.current.has(card.term_id)) {
+        queuedIds.current.add(card.term_id);
+        cardHeap.push(card);
+      }
+    });
+  };
 
   const fetchDeckData = useCallback(async () => {
     try {
@@ -19,7 +32,8 @@ const AnkiPage = () => {
       const data = await response.json();
       setDeck(data.deck);
       setDueCount(data.progress.dueCount);
-      data.cardQueue.forEach(card => cardHeap.push(card));
+      nextCursor.current = data.nextCursor;
+      queueCards(data.cardQueue);
       showNextCard();
     } catch (error) {
       console.error('Error initializing deck:', error);
@@ -30,8 +44,24 @@ const AnkiPage = () => {
     fetchDeckData();
   }, [fetchDeckData]);
 
+  const loadMoreCards = async () => {
+    try {
+      const cursor = encodeURIComponent(nextCursor.current);
+      const response = await fetch(`/decks/${deckId}/anki/load-more-cards?cursor=${cursor}`);
+      const data = await response.json();
+      nextCursor.current = data.nextCursor;
+      queueCards(data.cardQueue);
+      showNextCard();
+    } catch (error) {
+      console.error('Error loading more cards:', error);
+    }
+  };
+
   const showNextCard = () => {
-    setDueCount(cardHeap.length);
+    if (cardHeap.length === 0 && nextCursor.current) {
+      loadMoreCards();
+      return;
+    }
     if (cardHeap.length > 0) {
         let nextCard = cardHeap.pop();
 
@@ -85,7 +115,11 @@ const AnkiPage = () => {
       const updatedCard = { ...currentCard, ...data };
       
       if (data.interval < 1) {
+        // Still due today, so it stays in the queue and in the count
         cardHeap.push(updatedCard);
+      } else {
+        queuedIds.current.delete(currentCard.term_id);
+        setDueCount(count => Math.max(count - 1, 0));
       }
       console.log(cardHeap);
 
@@ -98,6 +132,7 @@ const AnkiPage = () => {
   const handleReset = async () => {
     try {
       await fetch(`/decks/${deckId}/anki/reset`, { method: 'POST' });
+      queuedIds.current.clear();
       fetchDeckData();
       setCardHeap(new Heap((a, b) => new Date(a.nextReview) - new Date(b.nextReview)));
     } catch (error) {
@@ -3,6 +3,7 @@ import { useParams, Link } from 'react-router-dom';
 import NewTermButton from '../components/NewTermButton';
 import TermCard from '../components/TermCard';
 import CSVImportButton from '../components/CSVImportButton';
+import fetchAllPages from '../fetchAllPages';
 import './DeckPage.css';
 
 export default function DeckPage() {
@@ -18,11 +19,7 @@ export default function DeckPage() {
   const fetchDeck = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`/decks/${deckId}/terms`);
-      if (!response.ok) {
-        throw new Error('Failed to fetch deck');
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`/decks/${deckId}/terms`, 'terms', 'Failed to fetch deck');
       setDeck(data);
     } catch (err) {
       setError(err.message);
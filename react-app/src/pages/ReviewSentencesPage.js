@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import FinishedSentenceCard from '../components/CompletedSentenceCard';
 import RatingBar from '../components/RatingBar';
+import fetchAllPages from '../fetchAllPages';
 import './ReviewSentencesPage.css';
 
 export default function ReviewSentencesPage() {
@@ -18,11 +19,7 @@ export default function ReviewSentencesPage() {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`/decks/${deckId}/sentences`);
-      if (!response.ok) {
-        throw new Error('Failed to fetch sentences');
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`/decks/${deckId}/sentences`, 'sentences', 'Failed to fetch sentences');
       setSentences(data.sentences);
     } catch (err) {
       setError(err.message);
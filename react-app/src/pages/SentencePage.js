@@ -2,6 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { useParams, Link, useNavigate } from 'react-router-dom';
 import SentenceCard from '../components/SentenceCard';
 import GenerateSentencesButton from '../components/GenerateSentencesButton';
+import fetchAllPages from '../fetchAllPages';
 import './SentencePage.css';
 
 export default function SentencePage() {
@@ -41,11 +42,7 @@ export default function SentencePage() {
     setLoading(true);
     setError(null);
     try {
-      const response = await fetch(`/decks/${deckId}/sentences`);
-      if (!response.ok) {
-        throw new Error('Failed to fetch sentences');
-      }
-      const data = await response.json();
+      const data = await fetchAllPages(`/decks/${deckId}/sentences`, 'sentences', 'Failed to fetch sentences');
       setSentences(data.sentences);
       setCurrentIndex(findFirstUntranslatedIndex(data.sentences));
     } catch (err) {